@@ -1,23 +1,167 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import Depends, FastAPI, Header, HTTPException, Query, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from pydantic import BaseModel, Field, EmailStr, field_validator
 import uvicorn
-from datetime import datetime
+from datetime import date, datetime
 from typing import Union
+from bisect import bisect_left, bisect_right, insort
+from collections import OrderedDict
+from functools import lru_cache
+from heapq import heappop, heappush
+from itertools import accumulate
+from array import array
+from threading import Lock, local
+from contextlib import contextmanager
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+import hashlib
+import hmac
+import json
+import logging
+import os
+import time
+import asyncio
+import gc
+import mmap
+import sqlite3
+import struct
+import tempfile
+from anyio import to_thread
 app = FastAPI()
+logger = logging.getLogger('uvicorn.error')
 
-employers = [
+class CredentialStore:
+    # Паролі зберігаються як солений PBKDF2-хеш; успішні перевірки кешуються на cache_ttl
+    # секунд, щоб повторні запити не платили за повільний KDF
+    def __init__(self, employers=(), iterations=100_000, cache_size=1024, cache_ttl=300):
+        self.iterations = iterations
+        self.cache_size = cache_size
+        self.cache_ttl = cache_ttl
+        self._users = {}
+        self._verified = OrderedDict()
+        self._cache_key = os.urandom(32)
+        self._lock = Lock()
+        for employer in employers:
+            self.add(employer)
+
+    def _hash(self, password, salt):
+        return hashlib.pbkdf2_hmac('sha256', password.encode(), salt, self.iterations)
+
+    def add(self, employer):
+        salt = os.urandom(16)
+        self._users[employer['username']] = {
+            'id': employer['id'], 'username': employer['username'], 'role': employer['role'],
+            'salt': salt, 'password_hash': self._hash(employer['password'], salt)
+        }
+        with self._lock:
+            for key in [key for key in self._verified if key[0] == employer['username']]:
+                del self._verified[key]
+
+    def dump(self):
+        return [(user['id'], user['username'], user['role'], user['salt'].hex(),
+                 user['password_hash'].hex()) for user in self._users.values()]
+
+    def load(self, rows):
+        self._users = {username: {'id': id, 'username': username, 'role': role,
+                                  'salt': bytes.fromhex(salt),
+                                  'password_hash': bytes.fromhex(password_hash)}
+                       for id, username, role, salt, password_hash in rows}
+        with self._lock:
+            self._verified.clear()
+
+    def role(self, username):
+        user = self._users.get(username)
+        return None if user is None else user['role']
+
+    def verify(self, username, password):
+        user = self._users.get(username)
+        if user is None:
+            return False
+        # У кеші лише HMAC пароля з ключем процесу, сам пароль не зберігається
+        key = (username, hmac.digest(self._cache_key, password.encode(), 'sha256'))
+        now = time.monotonic()
+        with self._lock:
+            expires = self._verified.get(key)
+            if expires is not None:
+                if expires > now:
+                    self._verified.move_to_end(key)
+                    return True
+                del self._verified[key]
+        if not hmac.compare_digest(self._hash(password, user['salt']), user['password_hash']):
+            return False
+        with self._lock:
+            self._verified[key] = now + self.cache_ttl
+            self._verified.move_to_end(key)
+            while len(self._verified) > self.cache_size:
+                self._verified.popitem(last=False)
+        return True
+
+class TokenSigner:
+    # Самодостатній токен: base64(username, role, exp) + HMAC-SHA256 підпис.
+    # Перевірка не звертається до сховища користувачів
+    def __init__(self, secret, ttl=3600):
+        self.secret = secret
+        self.ttl = ttl
+
+    def _sign(self, payload):
+        signature = hmac.digest(self.secret, payload.encode(), 'sha256')
+        return urlsafe_b64encode(signature).decode().rstrip('=')
+
+    def issue(self, username, role):
+        claims = {'sub': username, 'role': role, 'exp': int(time.time()) + self.ttl}
+        payload = urlsafe_b64encode(json.dumps(claims, separators=(',', ':')).encode())
+        payload = payload.decode().rstrip('=')
+        return f'{payload}.{self._sign(payload)}'
+
+    def verify(self, token):
+        payload, _, signature = token.partition('.')
+        if not hmac.compare_digest(self._sign(payload).encode(), signature.encode()):
+            return None
+        claims = json.loads(urlsafe_b64decode(payload + '=' * (-len(payload) % 4)))
+        if claims['exp'] <= time.time():
+            return None
+        return {'username': claims['sub'], 'role': claims['role']}
+
+credentials = CredentialStore([
     {'id': 0, 'username': 'Serhii1997', 'role': 'admin', 'password': 'hardwell25'},
     {'id': 1, 'username': 'Ivan1991', 'role': 'user', 'password': 'ivan25'},
     {'id': 2, 'username': 'Misha1990', 'role': 'user', 'password': 'misha25'},
     {'id': 3, 'username': 'Lana1994', 'role': 'moderator', 'password': 'lana25'}
-]
-tasks = [{'project_id': 0, 'project_tasks': [
-    {'task_id': 0, 'info': 'Дизайн', 'status': 'completed'},{'task_id': 1, 'info': 'Верстка', 'status': 'in progress'}
-    ]}]
-projects = [
-    {'user': 'Serhii1997', 'id': 0, 'title': 'Сайт для магазину сигарет', 'deadline': '25-01-2025', 'tasks': tasks[0],
-     'total_tasks': 2},
-]
+])
+secret = os.getenv('BIGFASTAPI_SECRET')
+tokens = TokenSigner(secret.encode() if secret else os.urandom(32))
+bearer = HTTPBearer(auto_error=False)
+
+SWEEP_INTERVAL = 60
+THREADPOOL_TOKENS = int(os.getenv('BIGFASTAPI_THREADPOOL_TOKENS', '40'))
+SNAPSHOT_PATH = os.getenv('BIGFASTAPI_SNAPSHOT')
+SNAPSHOT_INTERVAL = int(os.getenv('BIGFASTAPI_SNAPSHOT_INTERVAL', '300'))
+SNAPSHOT_CHUNK = 10_000
+DATABASE_PATH = os.getenv('BIGFASTAPI_DATABASE')
+WORKERS = int(os.getenv('BIGFASTAPI_WORKERS', '1'))
+PAGE_SIZE = 100
+
+@lru_cache(maxsize=4096)
+def parse_deadline(value):
+    return datetime.strptime(value, "%d-%m-%Y").date()
+
+def encode_cursor(key):
+    raw = json.dumps(key, ensure_ascii=False, separators=(',', ':')).encode()
+    return urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_cursor(cursor):
+    try:
+        status, task_id = json.loads(urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail='Невірний курсор')
+    if not isinstance(status, str) or not isinstance(task_id, int):
+        raise HTTPException(status_code=400, detail='Невірний курсор')
+    return status, task_id
+
+class LoginSchema(BaseModel):
+    username: str
+    password: str
 
 class TaskItem(BaseModel):
     task_id: int
@@ -37,115 +181,812 @@ class ProjectSchema(BaseModel):
     @field_validator('deadline')
     def validate_deadline(cls, value):
         try:
-            deadline_date = datetime.strptime(value, "%d-%m-%Y")
+            deadline_date = parse_deadline(value)
         except ValueError:
             raise ValueError("Дата повинна бути у форматі 'DD-MM-YYYY'.")
-        today = datetime.today()
-        if deadline_date <= today:
+        if deadline_date <= date.today():
             raise ValueError("Дата завершення повинна бути в майбутньому.")
         return value
 
-def authenticated(username, password):
-    for element in employers:
-        if element['username'] == username and element['password'] == password:
-            return True
-    return False
+class VersionConflict(Exception):
+    def __init__(self, version):
+        super().__init__(version)
+        self.version = version
 
-@app.get('/projects', summary='Всі проєкти', tags=['Проєкти'])
-def all_projects():
-    for project in projects:
+class ProjectRepository:
+    # Зміни одного проєкту серіалізуються його власним замком і перевіряють версію
+    # (compare-and-set); глобального замка на всі проєкти немає
+    def __init__(self, projects=(), tasks=()):
+        self._deadline_lock = Lock()
+        self._reset()
+        for project in projects:
+            self.add_project(project)
+        for group in tasks:
+            for task in group['project_tasks']:
+                self._insert_task(group['project_id'], dict(task))
+        # Наступний id проєкту зберігається в знімку: видалений найбільший id не видається вдруге
+        self._project_id_lock = Lock()
+        self.next_project_id = max(self._projects, default=-1) + 1
+        self.expire_due(date.today())
+
+    def _reset(self):
+        self._projects = {}
+        # id проєкту -> {task_id: завдання}
+        self._tasks = {}
+        # username -> {id проєкту: None}, впорядкована множина
+        self._by_owner = {}
+        # id проєкту -> {статус: відсортовані task_id}; кількість за статусом — довжина кошика
+        self._by_status = {}
+        # id проєкту -> відсортовані назви статусів
+        self._statuses = {}
+        self._next_task_id = {}
+        self._versions = {}
+        self._locks = {}
+        # id проєкту -> дата дедлайну; мін-купа (дедлайн, id) для фонового прибирання
+        self._deadlines = {}
+        self._deadline_heap = []
+        self._read_only = set()
+        # Лічильник змін для пропуску знімків, коли нічого не змінилось
+        self.revision = 0
+
+    def project_ids(self):
+        return list(self._projects)
+
+    def dump_project(self, id):
+        # Рядок проєкту і його завдання (за task_id) для знімка; None, якщо проєкт уже видалено
+        project = self._projects.get(id)
+        if project is None:
+            return None
+        return ((id, project['user'], project['title'], project['deadline'],
+                 self._versions[id], self._next_task_id[id]),
+                [(id, task_id, task['info'], task['status'])
+                 for task_id, task in sorted(self._tasks[id].items())])
+
+    def load(self, projects, tasks, next_project_id=0):
+        # Масове відновлення: завдання йдуть за task_id, тож кошики статусів
+        # будуються простим append без insort
+        self._reset()
+        for id, user, title, deadline, version, next_task_id in projects:
+            self.add_project({'user': user, 'id': id, 'title': title, 'deadline': deadline})
+            self._versions[id] = version
+            self._next_task_id[id] = next_task_id
+        current = None
+        for project_id, task_id, info, status in tasks:
+            if project_id != current:
+                current = project_id
+                project_tasks = self._tasks[project_id]
+                buckets = self._by_status[project_id]
+            project_tasks[task_id] = {'task_id': task_id, 'info': info, 'status': status}
+            bucket = buckets.get(status)
+            if bucket is None:
+                bucket = buckets[status] = []
+            bucket.append(task_id)
+        for project_id, buckets in self._by_status.items():
+            self._statuses[project_id] = sorted(buckets)
+        self.next_project_id = max(max(self._projects, default=-1) + 1, next_project_id)
+        self.revision = 0
+        self.expire_due(date.today())
+
+    def _index_status(self, project_id, task):
+        buckets = self._by_status[project_id]
+        if task['status'] not in buckets:
+            buckets[task['status']] = []
+            insort(self._statuses[project_id], task['status'])
+        insort(buckets[task['status']], task['task_id'])
+
+    def _unindex_status(self, project_id, task):
+        buckets = self._by_status[project_id]
+        bucket = buckets[task['status']]
+        del bucket[bisect_left(bucket, task['task_id'])]
+        if not bucket:
+            del buckets[task['status']]
+            statuses = self._statuses[project_id]
+            del statuses[bisect_left(statuses, task['status'])]
+
+    def _insert_task(self, project_id, task):
+        self._tasks[project_id][task['task_id']] = task
+        self._index_status(project_id, task)
+        self._next_task_id[project_id] = max(self._next_task_id[project_id], task['task_id'] + 1)
+        return task
+
+    def new_project_id(self):
+        with self._project_id_lock:
+            id = self.next_project_id
+            self.next_project_id += 1
+            return id
+
+    def version(self, id):
+        return self._versions.get(id)
+
+    def _apply(self, project_id, expected_version, change):
+        # Повертає (результат, версія проєкту); (None, None), якщо проєкту немає
+        lock = self._locks.get(project_id)
+        if lock is None:
+            return None, None
+        with lock:
+            if project_id not in self._projects:
+                return None, None
+            version = self._versions[project_id]
+            if expected_version is not None and expected_version != version:
+                raise VersionConflict(version)
+            result = change()
+            if result is not None:
+                version = self._versions[project_id] = version + 1
+                self.revision += 1
+            return result, version
+
+    def add_project(self, project):
+        project = {key: project[key] for key in ('user', 'id', 'title', 'deadline')}
+        self._projects[project['id']] = project
+        self._tasks.setdefault(project['id'], {})
+        self._by_status.setdefault(project['id'], {})
+        self._statuses.setdefault(project['id'], [])
+        self._next_task_id.setdefault(project['id'], 1)
+        self._versions.setdefault(project['id'], 0)
+        self._locks.setdefault(project['id'], Lock())
+        self._by_owner.setdefault(project['user'], {})[project['id']] = None
+        self._deadlines[project['id']] = parse_deadline(project['deadline'])
+        with self._deadline_lock:
+            heappush(self._deadline_heap, (self._deadlines[project['id']], project['id']))
+        self.revision += 1
+        return project
+
+    def get_project(self, id):
+        return self._projects.get(id)
+
+    def owns(self, username, id):
+        return id in self._by_owner.get(username, {})
+
+    def is_read_only(self, id):
+        return id in self._read_only
+
+    def expire_due(self, today):
+        # Проєкти з дедлайном до сьогодні стають лише для читання; застарілі записи
+        # купи (видалений проєкт) просто відкидаються
+        expired = []
+        with self._deadline_lock:
+            while self._deadline_heap and self._deadline_heap[0][0] < today:
+                deadline, id = heappop(self._deadline_heap)
+                if self._deadlines.get(id) == deadline:
+                    self._read_only.add(id)
+                    expired.append(id)
+        return expired
+
+    def remove_project(self, id, expected_version=None):
+        def change():
+            project = self._projects.pop(id)
+            del self._tasks[id]
+            del self._by_status[id]
+            del self._statuses[id]
+            del self._next_task_id[id]
+            del self._deadlines[id]
+            self._read_only.discard(id)
+            # Порожня множина власника лишається, щоб не гонитись з add_project
+            self._by_owner[project['user']].pop(id, None)
+            return project
+        project, version = self._apply(id, expected_version, change)
+        if project is not None:
+            del self._versions[id]
+            del self._locks[id]
+        return project
+
+    def tasks_of(self, project_id):
+        tasks = self._tasks.get(project_id)
+        return None if tasks is None else list(tasks.values())
+
+    def task_page(self, project_id, status=None, after=None, limit=None):
+        # Кошики вже впорядковані, тож список за статусом — це їх конкатенація.
+        # after — ключ (статус, task_id) останнього виданого завдання.
+        # Повертає (завдання, ключ для наступної сторінки або None)
+        tasks = self._tasks.get(project_id)
+        if tasks is None:
+            return None
+        buckets = self._by_status[project_id]
+        statuses = self._statuses[project_id] if status is None else [status]
+        limit = len(tasks) if limit is None else limit
+        start = 0 if after is None else bisect_left(statuses, after[0])
+        keys = []
+        for name in statuses[start:]:
+            bucket = buckets.get(name, [])
+            first = bisect_right(bucket, after[1]) if after is not None and name == after[0] else 0
+            keys.extend((name, task_id) for task_id in bucket[first:first + limit + 1 - len(keys)])
+            if len(keys) > limit:
+                break
+        next_key = keys[limit - 1] if len(keys) > limit else None
+        return [tasks[task_id] for _, task_id in keys[:limit]], next_key
+
+    def status_counts(self, project_id):
+        return {status: len(bucket) for status, bucket in self._by_status[project_id].items()}
+
+    def task_group(self, project_id):
+        return {'project_id': project_id, 'project_tasks': self.tasks_of(project_id)}
+
+    def project_view(self, id):
+        # Нові словники на кожне читання — спільний стан не змінюється
+        project = self._projects.get(id)
+        tasks = self._tasks.get(id)
+        if project is None or tasks is None:
+            return None
+        return {**project, 'tasks': self.task_group(id), 'total_tasks': len(tasks),
+                'status_counts': self.status_counts(id)}
+
+    def project_views(self):
+        return [self.project_view(id) for id in self._projects]
+
+    def add_task(self, project_id, info, status='not started', expected_version=None):
+        def change():
+            task = {'task_id': self._next_task_id[project_id], 'info': info, 'status': status}
+            return self._insert_task(project_id, task)
+        return self._apply(project_id, expected_version, change)
+
+    def set_task_status(self, project_id, task_id, status, expected_version=None):
+        def change():
+            task = self._tasks[project_id].get(task_id)
+            if task is not None and task['status'] != status:
+                self._unindex_status(project_id, task)
+                task['status'] = status
+                self._index_status(project_id, task)
+            return task
+        return self._apply(project_id, expected_version, change)
+
+    def remove_task(self, project_id, task_id, expected_version=None):
+        def change():
+            task = self._tasks[project_id].pop(task_id, None)
+            if task is not None:
+                self._unindex_status(project_id, task)
+            return task
+        return self._apply(project_id, expected_version, change)
+
+class SqliteProjectRepository:
+    # Той самий інтерфейс, що й ProjectRepository, але стан лежить у файлі SQLite в
+    # режимі WAL, спільному для всіх воркерів uvicorn. Читачі не блокують ні один
+    # одного, ні записувача; зміни проходять через BEGIN IMMEDIATE з перевіркою версії
+    def __init__(self, path, projects=(), tasks=(), timeout=5.0):
+        self.path = path
+        self.timeout = timeout
+        self._local = local()
+        with self._transaction() as db:
+            for statement in (
+                    "CREATE TABLE IF NOT EXISTS projects (id INTEGER PRIMARY KEY,"
+                    " user TEXT NOT NULL, title TEXT NOT NULL, deadline TEXT NOT NULL,"
+                    " deadline_date TEXT NOT NULL, version INTEGER NOT NULL DEFAULT 0,"
+                    " next_task_id INTEGER NOT NULL DEFAULT 1,"
+                    " read_only INTEGER NOT NULL DEFAULT 0)",
+                    "CREATE INDEX IF NOT EXISTS projects_user ON projects (user, id)",
+                    "CREATE INDEX IF NOT EXISTS projects_deadline ON projects (deadline_date)"
+                    " WHERE read_only = 0",
+                    "CREATE TABLE IF NOT EXISTS tasks (project_id INTEGER NOT NULL,"
+                    " task_id INTEGER NOT NULL, info TEXT NOT NULL, status TEXT NOT NULL,"
+                    " PRIMARY KEY (project_id, task_id)) WITHOUT ROWID",
+                    "CREATE INDEX IF NOT EXISTS tasks_status ON tasks (project_id, status, task_id)",
+                    "CREATE TABLE IF NOT EXISTS settings (name TEXT PRIMARY KEY, value)"):
+                db.execute(statement)
+            # Початкові дані пишуться один раз — першим воркером, що створив базу
+            if db.execute("SELECT 1 FROM settings WHERE name = 'next_project_id'").fetchone() is None:
+                for project in projects:
+                    self._insert_project(db, project)
+                for group in tasks:
+                    for task in group['project_tasks']:
+                        db.execute("INSERT INTO tasks VALUES (?, ?, ?, ?)",
+                                   (group['project_id'], task['task_id'], task['info'],
+                                    task['status']))
+                        db.execute("UPDATE projects SET next_task_id = max(next_task_id, ?)"
+                                   " WHERE id = ?", (task['task_id'] + 1, group['project_id']))
+                db.execute("INSERT INTO settings VALUES ('next_project_id',"
+                           " (SELECT coalesce(max(id), -1) + 1 FROM projects))")
+        self.expire_due(date.today())
+
+    def _db(self):
+        # Власне з'єднання на потік; isolation_level=None — транзакції керуються вручну.
+        # З'єднання, успадковане через fork, не використовується
+        db = getattr(self._local, 'db', None)
+        if db is None or self._local.pid != os.getpid():
+            self._local.pid = os.getpid()
+            db = self._local.db = sqlite3.connect(self.path, timeout=self.timeout,
+                                                  isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            # У WAL режим NORMAL не втрачає узгодженості, лише останні коміти при збої ОС
+            db.execute("PRAGMA synchronous=NORMAL")
+        return db
+
+    @contextmanager
+    def _transaction(self, mode='IMMEDIATE'):
+        # IMMEDIATE одразу бере замок запису; DEFERRED дає читачу один знімок бази
+        db = self._db()
+        db.execute(f"BEGIN {mode}")
+        try:
+            yield db
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        db.execute("COMMIT")
+
+    def _insert_project(self, db, project):
+        project = {key: project[key] for key in ('user', 'id', 'title', 'deadline')}
+        db.execute("INSERT INTO projects (id, user, title, deadline, deadline_date)"
+                   " VALUES (?, ?, ?, ?, ?)",
+                   (project['id'], project['user'], project['title'], project['deadline'],
+                    parse_deadline(project['deadline']).isoformat()))
+        return project
+
+    def shared_secret(self, default):
+        # Ключ підпису токенів один на всі воркери: перший записує, решта читають
+        with self._transaction() as db:
+            db.execute("INSERT OR IGNORE INTO settings VALUES ('token_secret', ?)", (default,))
+            return db.execute("SELECT value FROM settings WHERE name = 'token_secret'").fetchone()[0]
+
+    def new_project_id(self):
+        return self._db().execute("UPDATE settings SET value = value + 1"
+                                  " WHERE name = 'next_project_id' RETURNING value - 1").fetchone()[0]
+
+    def version(self, id):
+        row = self._db().execute("SELECT version FROM projects WHERE id = ?", (id,)).fetchone()
+        return None if row is None else row[0]
+
+    def _apply(self, project_id, expected_version, change):
+        # Повертає (результат, версія проєкту); (None, None), якщо проєкту немає
+        with self._transaction() as db:
+            row = db.execute("SELECT version FROM projects WHERE id = ?", (project_id,)).fetchone()
+            if row is None:
+                return None, None
+            version = row[0]
+            if expected_version is not None and expected_version != version:
+                raise VersionConflict(version)
+            result = change(db)
+            if result is not None:
+                version += 1
+                db.execute("UPDATE projects SET version = ? WHERE id = ?", (version, project_id))
+            return result, version
+
+    def add_project(self, project):
+        with self._transaction() as db:
+            return self._insert_project(db, project)
+
+    def get_project(self, id):
+        row = self._db().execute("SELECT user, id, title, deadline FROM projects WHERE id = ?",
+                                 (id,)).fetchone()
+        return None if row is None else dict(zip(('user', 'id', 'title', 'deadline'), row))
+
+    def owns(self, username, id):
+        return self._db().execute("SELECT 1 FROM projects WHERE id = ? AND user = ?",
+                                  (id, username)).fetchone() is not None
+
+    def is_read_only(self, id):
+        row = self._db().execute("SELECT read_only FROM projects WHERE id = ?", (id,)).fetchone()
+        return row is not None and bool(row[0])
+
+    def expire_due(self, today):
+        # Прибирач працює в кожному воркері; повторна позначка нічого не змінює
+        rows = self._db().execute("UPDATE projects SET read_only = 1"
+                                  " WHERE read_only = 0 AND deadline_date < ? RETURNING id",
+                                  (today.isoformat(),)).fetchall()
+        return [id for id, in rows]
+
+    def remove_project(self, id, expected_version=None):
+        def change(db):
+            project = self.get_project(id)
+            db.execute("DELETE FROM tasks WHERE project_id = ?", (id,))
+            db.execute("DELETE FROM projects WHERE id = ?", (id,))
+            return project
+        project, version = self._apply(id, expected_version, change)
+        return project
+
+    def _tasks(self, db, project_id):
+        rows = db.execute("SELECT task_id, info, status FROM tasks WHERE project_id = ?"
+                          " ORDER BY task_id", (project_id,))
+        return [{'task_id': task_id, 'info': info, 'status': status}
+                for task_id, info, status in rows]
+
+    def _exists(self, db, project_id):
+        return db.execute("SELECT 1 FROM projects WHERE id = ?", (project_id,)).fetchone() is not None
+
+    def tasks_of(self, project_id):
+        with self._transaction('DEFERRED') as db:
+            return self._tasks(db, project_id) if self._exists(db, project_id) else None
+
+    def task_page(self, project_id, status=None, after=None, limit=None):
+        # Той самий порядок (статус, task_id), що й у пам'яті, з індексу tasks_status
+        with self._transaction('DEFERRED') as db:
+            if not self._exists(db, project_id):
+                return None
+            query = "SELECT task_id, info, status FROM tasks WHERE project_id = ?"
+            params = [project_id]
+            if status is not None:
+                query += " AND status = ?"
+                params.append(status)
+            if after is not None:
+                query += " AND (status, task_id) > (?, ?)"
+                params.extend(after)
+            query += " ORDER BY status, task_id LIMIT ?"
+            params.append(-1 if limit is None else limit + 1)
+            rows = db.execute(query, params).fetchall()
+        next_key = None
+        if limit is not None and len(rows) > limit:
+            rows = rows[:limit]
+            next_key = (rows[-1][2], rows[-1][0])
+        return [{'task_id': task_id, 'info': info, 'status': status}
+                for task_id, info, status in rows], next_key
+
+    def status_counts(self, project_id):
+        return dict(self._db().execute("SELECT status, count(*) FROM tasks WHERE project_id = ?"
+                                       " GROUP BY status", (project_id,)))
+
+    def task_group(self, project_id):
+        return {'project_id': project_id, 'project_tasks': self.tasks_of(project_id)}
+
+    @staticmethod
+    def _view(project, tasks):
+        counts = {}
         for task in tasks:
-            if task['project_id'] == project['id']:
-                project['tasks'] = task
-                project['total_tasks'] = len(task['project_tasks'])
-    return projects
-
-@app.post('/create/project/{username}/{password}', summary='Створення проекту', tags=['Проєкти'])
-def create_project(username: str, password: str, project: ProjectSchema):
-    if authenticated(username, password):
-        pro_id = len(projects)
-        project.id = pro_id
-        project.user = username
-        initial_tasks = {'project_id': pro_id, 'project_tasks': []}
-        tasks.append(initial_tasks)
-        project.tasks = initial_tasks
-        projects.append(project.model_dump())
-        return {'message': 'Project created', 'project': project.model_dump()}
-    raise HTTPException(status_code=401, detail="Не правильний пароль або ім'я")
+            counts[task['status']] = counts.get(task['status'], 0) + 1
+        return {**project, 'tasks': {'project_id': project['id'], 'project_tasks': tasks},
+                'total_tasks': len(tasks), 'status_counts': counts}
 
-@app.post('/create/task/{username}/{password}', summary='Створення завдання', tags=['Проєкти'])
-def create_task(username: str, password: str, schemaTask: TaskItem, id: int):
-    if authenticated(username, password):
-        for project in projects:
-            if project['id'] == id and project['user'] == username:
-                for task in tasks:
-                    if task['project_id'] == id:
-                        schemaTask.task_id = len(task['project_tasks']) + 1
-                        task['project_tasks'].append({
-                            'task_id': schemaTask.task_id,
-                            'info': schemaTask.info,
-                            'status': 'not started'
-                            })
-                        return {'message': 'Task created', 'task': task}
-    raise HTTPException(status_code=401, detail="Не правильний пароль або ім'я")
+    def project_view(self, id):
+        with self._transaction('DEFERRED') as db:
+            project = self.get_project(id)
+            if project is None:
+                return None
+            return self._view(project, self._tasks(db, id))
 
-@app.put('/change/task/{username}/{password}', summary='Змінити статус завдання', tags=['Проєкти'])
-def change_task(username: str, password: str, schemaTask: TaskItem, id: int):
-    if authenticated(username, password):
-        for project in projects:
-            if project['id'] == id and project['user'] == username:
-                for task in tasks:
-                    if task['project_id'] == id:
-                        for project_task in task['project_tasks']:
-                            if project_task['task_id'] == schemaTask.task_id:
-                                project_task['status'] = schemaTask.status
-                                return {'message': 'task updated', 'task': project_task}
-                raise HTTPException(status_code=404, detail="Task not found")
-    raise HTTPException(status_code=401, detail="Не правильний пароль або ім'я")
+    def project_views(self):
+        # Два запити замість двох на проєкт; завдання йдуть за (project_id, task_id)
+        with self._transaction('DEFERRED') as db:
+            projects = db.execute("SELECT user, id, title, deadline FROM projects ORDER BY id").fetchall()
+            rows = db.execute("SELECT project_id, task_id, info, status FROM tasks"
+                              " ORDER BY project_id, task_id").fetchall()
+        tasks = {}
+        for project_id, task_id, info, status in rows:
+            tasks.setdefault(project_id, []).append(
+                {'task_id': task_id, 'info': info, 'status': status})
+        return [self._view(dict(zip(('user', 'id', 'title', 'deadline'), project)),
+                           tasks.get(project[1], []))
+                for project in projects]
 
-@app.delete('/delete/task/{username}/{password}', summary='Видалити завдання', tags=['Проєкти'])
-def delete_task(username: str, password: str, id: int, schemaTask: TaskItem, task_id: int):
-    if authenticated(username, password):
-        for project in projects:
-            if project['id'] == id and project['user'] == username:
-                for el in tasks:
-                    if el['project_id'] == id:
-                        for index, project_task in enumerate(el['project_tasks']):
-                            if project_task['task_id'] == task_id:
-                                del el['project_tasks'][index]
-                                return {'message': 'task deleted'}
-    raise HTTPException(status_code=401, detail="Не правильний пароль або ім'я")
+    def add_task(self, project_id, info, status='not started', expected_version=None):
+        def change(db):
+            task_id = db.execute("UPDATE projects SET next_task_id = next_task_id + 1"
+                                 " WHERE id = ? RETURNING next_task_id - 1",
+                                 (project_id,)).fetchone()[0]
+            db.execute("INSERT INTO tasks VALUES (?, ?, ?, ?)", (project_id, task_id, info, status))
+            return {'task_id': task_id, 'info': info, 'status': status}
+        return self._apply(project_id, expected_version, change)
+
+    def set_task_status(self, project_id, task_id, status, expected_version=None):
+        def change(db):
+            row = db.execute("SELECT info, status FROM tasks WHERE project_id = ? AND task_id = ?",
+                             (project_id, task_id)).fetchone()
+            if row is None:
+                return None
+            if row[1] != status:
+                db.execute("UPDATE tasks SET status = ? WHERE project_id = ? AND task_id = ?",
+                           (status, project_id, task_id))
+            return {'task_id': task_id, 'info': row[0], 'status': status}
+        return self._apply(project_id, expected_version, change)
+
+    def remove_task(self, project_id, task_id, expected_version=None):
+        def change(db):
+            row = db.execute("DELETE FROM tasks WHERE project_id = ? AND task_id = ?"
+                             " RETURNING info, status", (project_id, task_id)).fetchone()
+            return None if row is None else {'task_id': task_id, 'info': row[0], 'status': row[1]}
+        return self._apply(project_id, expected_version, change)
+
+SEED_PROJECTS = [{'user': 'Serhii1997', 'id': 0, 'title': 'Сайт для магазину сигарет',
+                  'deadline': '25-01-2025'}]
+SEED_TASKS = [{'project_id': 0, 'project_tasks': [
+    {'task_id': 0, 'info': 'Дизайн', 'status': 'completed'},
+    {'task_id': 1, 'info': 'Верстка', 'status': 'in progress'}
+]}]
+
+if DATABASE_PATH is None:
+    repository = ProjectRepository(projects=SEED_PROJECTS, tasks=SEED_TASKS)
+else:
+    repository = SqliteProjectRepository(DATABASE_PATH, projects=SEED_PROJECTS, tasks=SEED_TASKS)
+    if secret is None:
+        tokens.secret = repository.shared_secret(tokens.secret)
+
+# Знімок: заголовок, таблиця рядків (довжини в символах + один UTF-8 блок) і колонки
+# фіксованої ширини для працівників, проєктів і завдань. Рядки в колонках — індекси
+# в таблиці. Кожна секція вирівняна на 8 байтів, щоб читати її через memoryview.cast
+SNAPSHOT_MAGIC = b'BFAS'
+SNAPSHOT_FORMAT = 2
+# Формат 1 не мав наступного id проєкту; такі знімки ще читаються
+SNAPSHOT_HEADERS = {1: struct.Struct('<4sHxxQQQQQ'), 2: struct.Struct('<4sHxxQQQQQQ')}
+SNAPSHOT_HEADER = SNAPSHOT_HEADERS[SNAPSHOT_FORMAT]
+USER_COLUMNS = 'qIIII'
+PROJECT_COLUMNS = 'qIIIqq'
+TASK_COLUMNS = 'qqII'
+
+def padded(size):
+    return size + (-size % 8)
+
+def encode_snapshot(users, projects, tasks, next_project_id=0):
+    strings = {}
+    columns = []
+    for rows, kinds in ((users, USER_COLUMNS), (projects, PROJECT_COLUMNS), (tasks, TASK_COLUMNS)):
+        for index, kind in enumerate(kinds):
+            if kind == 'I':
+                columns.append(array('I', [strings.setdefault(row[index], len(strings))
+                                           for row in rows]))
+            else:
+                columns.append(array('q', [row[index] for row in rows]))
+    blob = ''.join(strings).encode()
+    parts = [SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_FORMAT, len(strings), len(blob),
+                                  len(users), len(projects), len(tasks), next_project_id),
+             array('I', map(len, strings)).tobytes(), blob]
+    parts.extend(column.tobytes() for column in columns)
+    return b''.join(part + bytes(-len(part) % 8) for part in parts)
+
+def decode_snapshot(buffer):
+    with memoryview(buffer) as view:
+        magic, version = struct.unpack_from('<4sH', view)
+        header = SNAPSHOT_HEADERS.get(version)
+        if magic != SNAPSHOT_MAGIC or header is None:
+            raise ValueError('Невідомий формат знімка')
+        (string_count, blob_size, user_count, project_count,
+         task_count, *next_project_id) = header.unpack_from(view)[2:]
+        offset = padded(header.size)
+
+        def column(kind, length):
+            nonlocal offset
+            with view[offset:offset + length * struct.calcsize(kind)] as part:
+                offset += padded(len(part))
+                with part.cast(kind) as values:
+                    return values.tolist()
+
+        ends = list(accumulate(column('I', string_count)))
+        with view[offset:offset + blob_size] as part:
+            text = str(part, 'utf-8')
+        offset += padded(blob_size)
+        strings = [text[start:end] for start, end in zip([0] + ends, ends)]
+
+        def rows(kinds, length):
+            values = []
+            for kind in kinds:
+                data = column(kind, length)
+                values.append([strings[index] for index in data] if kind == 'I' else data)
+            return zip(*values)
 
-@app.delete('/delete/project/{username}/{password}', summary='Видалити проєкт', tags=['Проєкти'])
-def delete_project(username: str, password: str, id: int):
-    if authenticated(username, password):
-        for user in employers:
-            if user['username'] == username and user['role'] == 'admin':
-                for index, project in enumerate(projects):
-                    if project['id'] == id:
-                        del projects[index]
-                        return {'message': 'Project deleted'}
-            raise HTTPException(status_code=401, detail="Ви не можете видаляти проєкти")
+        return (rows(USER_COLUMNS, user_count), rows(PROJECT_COLUMNS, project_count),
+                rows(TASK_COLUMNS, task_count), next_project_id[0] if next_project_id else 0)
+
+def write_snapshot(path, state):
+    # Унікальний тимчасовий файл поруч зі знімком: os.replace атомарний лише в межах
+    # однієї файлової системи, а два записи не мають ділити один .tmp
+    descriptor, temp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)),
+                                             prefix=os.path.basename(path), suffix='.tmp')
+    try:
+        with os.fdopen(descriptor, 'wb') as file:
+            file.write(encode_snapshot(*state))
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+def read_snapshot(path):
+    # Мільйони нових dict/tuple раз у раз запускають циклічний GC, хоча циклів тут немає
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        with open(path, 'rb') as file, \
+                mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            users, projects, tasks, next_project_id = decode_snapshot(mapped)
+        credentials.load(users)
+        repository.load(projects, tasks, next_project_id)
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+async def dump_repository():
+    # Рядки збираються в циклі подій (там же йдуть усі зміни) по проєктах, з паузами після
+    # кожних SNAPSHOT_CHUNK рядків. Кожен проєкт узгоджений сам по собі, а зміни, що прийшли
+    # під час збору, підхопить наступний знімок: ревізія береться до початку
+    # Циклічний GC вимкнено з тієї ж причини, що й у read_snapshot: повні проходи по
+    # мільйонах нових кортежів давали паузи в десятки мілісекунд між порціями
+    projects, tasks = [], []
+    collected = 0
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for id in repository.project_ids():
+            dumped = repository.dump_project(id)
+            if dumped is None:
+                continue
+            projects.append(dumped[0])
+            tasks.extend(dumped[1])
+            collected += len(dumped[1]) + 1
+            if collected >= SNAPSHOT_CHUNK:
+                collected = 0
+                await asyncio.sleep(0)
+    finally:
+        if gc_enabled:
+            gc.enable()
+    # Лічильник читається після збору, тож він більший за будь-який id, що потрапив у знімок
+    return projects, tasks, repository.next_project_id
+
+async def save_snapshot():
+    revision = repository.revision
+    if revision == app.state.snapshot_revision:
+        return
+    # Кодування і запис — у потоці
+    state = (credentials.dump(), *await dump_repository())
+    await to_thread.run_sync(write_snapshot, SNAPSHOT_PATH, state)
+    app.state.snapshot_revision = revision
+
+async def snapshot_periodically():
+    while True:
+        await asyncio.sleep(SNAPSHOT_INTERVAL)
+        await save_snapshot()
+
+@app.on_event("startup")
+async def restore_snapshot():
+    app.state.snapshot_revision = None
+    app.state.snapshotter = None
+    # Файл SQLite сам по собі довговічний, знімки потрібні лише сховищу в пам'яті
+    if SNAPSHOT_PATH is None or DATABASE_PATH is not None:
+        return
+    if os.path.exists(SNAPSHOT_PATH):
+        read_snapshot(SNAPSHOT_PATH)
+        app.state.snapshot_revision = repository.revision
+    app.state.snapshotter = asyncio.create_task(snapshot_periodically())
+
+@app.on_event("shutdown")
+async def final_snapshot():
+    if app.state.snapshotter is not None:
+        # Чекаємо, поки періодичний запис (якщо він уже в потоці) завершиться
+        app.state.snapshotter.cancel()
+        try:
+            await app.state.snapshotter
+        except asyncio.CancelledError:
+            pass
+        await save_snapshot()
+
+async def stored(method, *args, **kwargs):
+    # Сховище в пам'яті відповідає одразу; виклик SQLite може чекати на замок запису
+    # іншого воркера, тож іде в пул потоків (з'єднання там свої для кожного потоку)
+    if DATABASE_PATH is None:
+        return method(*args, **kwargs)
+    return await run_in_threadpool(method, *args, **kwargs)
+
+def writable_project(username, id):
+    if not repository.owns(username, id):
+        raise HTTPException(status_code=404, detail="Проєкт не знайдено")
+    if repository.is_read_only(id):
+        raise HTTPException(status_code=403, detail="Дедлайн проєкту минув, завдання змінювати не можна")
+
+def expected_version(if_match):
+    # ETag проєкту — його версія в лапках; If-Match порівнюється строго
+    if if_match is None or if_match.strip() == '*':
+        return None
+    try:
+        return int(if_match.strip().strip('"'))
+    except ValueError:
+        raise HTTPException(status_code=412, detail="Невірний заголовок If-Match")
+
+def etag(version):
+    return f'"{version}"'
+
+@app.exception_handler(VersionConflict)
+async def version_conflict(request, error):
+    return JSONResponse(status_code=412, headers={'ETag': etag(error.version)},
+                        content={'detail': "Проєкт змінено іншим запитом"})
+
+async def sweep_deadlines():
+    while True:
+        try:
+            await stored(repository.expire_due, date.today())
+        except Exception:
+            # Одна невдала спроба (наприклад, база зайнята) не зупиняє прибирання
+            logger.exception("Не вдалося позначити прострочені проєкти")
+        await asyncio.sleep(SWEEP_INTERVAL)
+
+@app.on_event("startup")
+async def configure_threadpool():
+    # У пул потоків іде /login з повільним KDF, а з BIGFASTAPI_DATABASE — і всі звернення до SQLite
+    to_thread.current_default_thread_limiter().total_tokens = THREADPOOL_TOKENS
+
+@app.on_event("startup")
+async def start_sweeper():
+    app.state.sweeper = asyncio.create_task(sweep_deadlines())
+
+@app.on_event("shutdown")
+async def stop_sweeper():
+    app.state.sweeper.cancel()
+
+async def current_user(authorization: HTTPAuthorizationCredentials | None = Depends(bearer)):
+    user = None if authorization is None else tokens.verify(authorization.credentials)
+    if user is None:
+        raise HTTPException(status_code=401, detail="Недійсний або прострочений токен",
+                            headers={'WWW-Authenticate': 'Bearer'})
+    return user
+
+@app.post('/login', summary='Отримати токен доступу', tags=['Авторизація'])
+def login(schema: LoginSchema):
+    if credentials.verify(schema.username, schema.password):
+        return {'access_token': tokens.issue(schema.username, credentials.role(schema.username)),
+                'token_type': 'bearer', 'expires_in': tokens.ttl}
     raise HTTPException(status_code=401, detail="Не правильний пароль або ім'я")
 
+@app.get('/projects', summary='Всі проєкти', tags=['Проєкти'])
+async def all_projects():
+    return await stored(repository.project_views)
+
+@app.post('/create/project', summary='Створення проекту', tags=['Проєкти'])
+async def create_project(project: ProjectSchema, user: dict = Depends(current_user)):
+    project.id = await stored(repository.new_project_id)
+    project.user = user['username']
+    project.tasks = {'project_id': project.id, 'project_tasks': []}
+    await stored(repository.add_project, project.model_dump())
+    return {'message': 'Project created', 'project': project.model_dump()}
+
+@app.post('/create/task', summary='Створення завдання', tags=['Проєкти'])
+async def create_task(schemaTask: TaskItem, id: int, response: Response,
+                      user: dict = Depends(current_user), if_match: str | None = Header(None)):
+    await stored(writable_project, user['username'], id)
+    task, version = await stored(repository.add_task, id, schemaTask.info,
+                                 expected_version=expected_version(if_match))
+    if task is None:
+        raise HTTPException(status_code=404, detail="Проєкт не знайдено")
+    response.headers['ETag'] = etag(version)
+    return {'message': 'Task created', 'task': await stored(repository.task_group, id)}
+
+@app.put('/change/task', summary='Змінити статус завдання', tags=['Проєкти'])
+async def change_task(schemaTask: TaskItem, id: int, response: Response,
+                      user: dict = Depends(current_user), if_match: str | None = Header(None)):
+    await stored(writable_project, user['username'], id)
+    project_task, version = await stored(
+        repository.set_task_status, id, schemaTask.task_id, schemaTask.status,
+        expected_version=expected_version(if_match))
+    if project_task is None:
+        raise HTTPException(status_code=404, detail="Task not found")
+    response.headers['ETag'] = etag(version)
+    return {'message': 'task updated', 'task': project_task}
+
+@app.delete('/delete/task', summary='Видалити завдання', tags=['Проєкти'])
+async def delete_task(id: int, task_id: int, response: Response,
+                      user: dict = Depends(current_user), if_match: str | None = Header(None)):
+    await stored(writable_project, user['username'], id)
+    task, version = await stored(repository.remove_task, id, task_id,
+                                 expected_version=expected_version(if_match))
+    if task is None:
+        raise HTTPException(status_code=404, detail="Task not found")
+    response.headers['ETag'] = etag(version)
+    return {'message': 'task deleted'}
+
+@app.delete('/delete/project', summary='Видалити проєкт', tags=['Проєкти'])
+async def delete_project(id: int, user: dict = Depends(current_user),
+                         if_match: str | None = Header(None)):
+    if user['role'] != 'admin':
+        raise HTTPException(status_code=401, detail="Ви не можете видаляти проєкти")
+    if await stored(repository.remove_project, id, expected_version(if_match)) is not None:
+        return {'message': 'Project deleted'}
+    raise HTTPException(status_code=401, detail="Ви не можете видаляти проєкти")
+
 @app.get('/get/project/task', summary='Переглянути завдання до проєкту', tags=['Проєкти'])
-def get_tasks(project_id: int):
-    for task in tasks:
-        if task['project_id'] == project_id:
-            sorted_tasks = sorted(task['project_tasks'], key=lambda t: t['status'])
-            return sorted_tasks
-    raise HTTPException(status_code=404, detail="Проєкт не знайдено")
+async def get_tasks(project_id: int, response: Response, status: str | None = None,
+                    cursor: str | None = None, limit: int | None = Query(None, ge=1, le=1000)):
+    after = None if cursor is None else decode_cursor(cursor)
+    if after is not None and limit is None:
+        limit = PAGE_SIZE
+    page = await stored(repository.task_page, project_id, status, after, limit)
+    if page is None:
+        raise HTTPException(status_code=404, detail="Проєкт не знайдено")
+    project_tasks, next_key = page
+    if next_key is not None:
+        response.headers['X-Next-Cursor'] = encode_cursor(next_key)
+    return project_tasks
 
 @app.get('/get/project/', summary='Переглянути проєкт', tags=['Проєкти'])
-def get_project(id: int):
-    for project in projects:
-        if project['id'] == id:
-            for task in tasks:
-                if task['project_id'] == id:
-                    project['tasks'] = task
-                    project['total_tasks'] = len(task['project_tasks'])
-            return project
-    raise HTTPException(status_code=404, detail="Task not found")
+async def get_project(id: int, response: Response):
+    version = await stored(repository.version, id)
+    project = await stored(repository.project_view, id)
+    if project is None:
+        raise HTTPException(status_code=404, detail="Task not found")
+    response.headers['ETag'] = etag(version)
+    return project
 
 
 
@@ -172,7 +1013,8 @@ def get_project(id: int):
 
 
 if __name__ == '__main__':
-    uvicorn.run(app=app, host='127.0.0.1', port=4000)
+    # Кілька воркерів мають сенс лише з BIGFASTAPI_DATABASE, інакше в кожного свої дані
+    uvicorn.run('BigFastAPI:app', host='127.0.0.1', port=4000, workers=WORKERS)
 
 """
 Авторизація:
@@ -1,9 +1,93 @@
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel, Field, EmailStr
+from fastapi import FastAPI, Header, HTTPException, Query, Request, Response
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field, EmailStr, TypeAdapter, ValidationError
+from typing import Annotated, Literal, Union
 import uvicorn
 from datetime import datetime
+from bisect import bisect_left, bisect_right, insort
+from itertools import count
+from heapq import nsmallest
+from base64 import urlsafe_b64encode, urlsafe_b64decode
+from fastapi.concurrency import run_in_threadpool
+from anyio import to_thread
+from pathlib import Path
+from threading import Condition, RLock, Thread
+import json
+import os
+import time
+import zlib
+from uuid import uuid4
 app = FastAPI()
 
+DATE_FORMATS = ('%d-%m-%Y %H:%M', '%Y-%m-%d %H:%M')
+PAGE_SIZE = 100
+DATA_DIR = os.getenv('FASTAPI_DATA_DIR')
+THREADPOOL_TOKENS = int(os.getenv('FASTAPI_THREADPOOL_TOKENS', '40'))
+# Індекс описів займає в рази більше пам'яті за назви, тож вмикається явно
+INDEX_DESCRIPTIONS = os.getenv('FASTAPI_INDEX_DESCRIPTIONS') == '1'
+
+def parse_date(value):
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, date_format)
+        except ValueError:
+            continue
+    return datetime.min
+
+def ngrams(text, size):
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+class NgramIndex:
+    # Постинги лише для n-грам довжини size; коротші запити (і вимкнений індекс)
+    # перевіряються перебором текстів
+    def __init__(self, size=3, indexed=True):
+        self.size = size
+        self.indexed = indexed
+        self._postings = {}
+        self._texts = {}
+
+    def add(self, key, text):
+        text = text.casefold()
+        self._texts[key] = text
+        if not self.indexed:
+            return
+        for gram in ngrams(text, self.size):
+            self._postings.setdefault(gram, set()).add(key)
+
+    def remove(self, key):
+        text = self._texts.pop(key, None)
+        if text is None or not self.indexed:
+            return
+        for gram in ngrams(text, self.size):
+            bucket = self._postings[gram]
+            bucket.discard(key)
+            if not bucket:
+                del self._postings[gram]
+
+    def candidates(self, query):
+        # Копія пар (ключ, текст) для перевірки поза замком власника: постинги звужують
+        # вибір, а без них копіюються всі тексти — це швидше за сам перебір
+        query = query.casefold()
+        if not self.indexed or len(query) < self.size:
+            return list(self._texts.items())
+        postings = sorted((self._postings.get(gram, set())
+                           for gram in ngrams(query, self.size)), key=len)
+        if not postings[0]:
+            return []
+        return [(key, self._texts[key]) for key in postings[0].intersection(*postings[1:])]
+
+    @staticmethod
+    def matches(candidates, query):
+        # Повертає {ключ: позиція входження} серед кандидатів
+        query = query.casefold()
+        matches = {}
+        for key, text in candidates:
+            position = text.find(query)
+            if position >= 0:
+                matches[key] = position
+        return matches
+
 class UserSchema(BaseModel):
     id: int
     name: str = Field(..., max_length=50)
@@ -17,13 +101,528 @@ class TasksSchema(BaseModel):
     status: str = Field(max_length=50, default='in progress') #in progress or completed
     date: str
 
-users = [
+class TaskCreate(BaseModel):
+    op: Literal['create']
+    task: TasksSchema
+
+class TaskUpdate(BaseModel):
+    op: Literal['update']
+    id: int
+    task: TasksSchema
+
+class TaskDelete(BaseModel):
+    op: Literal['delete']
+    id: int
+
+class UserCreate(BaseModel):
+    op: Literal['create']
+    user: UserSchema
+
+class UserUpdate(BaseModel):
+    op: Literal['update']
+    id: int
+    user: UserSchema
+
+class UserDelete(BaseModel):
+    op: Literal['delete']
+    id: int
+
+task_operations = TypeAdapter(list[Annotated[Union[TaskCreate, TaskUpdate, TaskDelete],
+                                             Field(discriminator='op')]])
+user_operations = TypeAdapter(list[Annotated[Union[UserCreate, UserUpdate, UserDelete],
+                                             Field(discriminator='op')]])
+
+def encode_cursor(scope, key):
+    raw = json.dumps([scope, *key], ensure_ascii=False, separators=(',', ':'))
+    return urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+def decode_cursor(scope, cursor):
+    try:
+        raw = urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        data = json.loads(raw)
+    except ValueError:
+        raise HTTPException(status_code=400, detail='Невірний курсор')
+    if not isinstance(data, list) or not data or data[0] != scope:
+        raise HTTPException(status_code=400, detail='Невірний курсор')
+    return tuple(data[1:])
+
+def page_keys(keys, after, limit):
+    # Курсор — останній виданий ключ, тож вставки і видалення не зсувають сторінки
+    start = 0 if after is None else bisect_right(keys, after)
+    return keys[start:start + limit]
+
+def paginate(scope, keys, lookup, cursor, limit):
+    # Повертає (елементи, заголовки) — курсор наступної сторінки йде в X-Next-Cursor
+    # Записи йдуть у потоках паралельно з читанням у циклі подій, тому ключі копіюються,
+    # а ключ щойно видаленого елемента (lookup повертає None) просто пропускається
+    if cursor is None and limit is None:
+        return [item for item in map(lookup, list(keys)) if item is not None], {}
+    limit = limit or PAGE_SIZE
+    after = None if cursor is None else decode_cursor(scope, cursor)
+    try:
+        chunk = page_keys(keys, after, limit + 1)
+    except TypeError:
+        raise HTTPException(status_code=400, detail='Невірний курсор')
+    headers = {}
+    if len(chunk) > limit:
+        chunk = chunk[:limit]
+        headers['X-Next-Cursor'] = encode_cursor(scope, chunk[-1])
+    return [item for item in map(lookup, chunk) if item is not None], headers
+
+def render_json(content):
+    # Те саме кодування, що й у JSONResponse
+    return json.dumps(content, ensure_ascii=False, allow_nan=False,
+                      separators=(',', ':')).encode('utf-8')
+
+def etag_matches(etag, if_none_match):
+    if if_none_match is None:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    # Для If-None-Match діє слабке порівняння, тож префікс W/ ігноруємо
+    return any(tag.strip().removeprefix('W/') == etag for tag in if_none_match.split(','))
+
+class ResponseCache:
+    # Готові JSON-байти відповідей; скидається, щойно змінюється версія колекції.
+    # ETag будується з версії без серіалізації, epoch відрізняє перезапуски процесу.
+    def __init__(self, store, name, max_entries=1024):
+        self.store = store
+        self.name = name
+        self.max_entries = max_entries
+        self._epoch = uuid4().hex[:8]
+        self._version = None
+        self._entries = {}
+
+    def etag(self, version, key):
+        return f'"{self.name}-{self._epoch}-{version}-{zlib.crc32(repr(key).encode()):08x}"'
+
+    def respond(self, key, build, if_none_match=None):
+        version = self.store.version
+        etag = self.etag(version, key)
+        if etag_matches(etag, if_none_match):
+            return Response(status_code=304, headers={'ETag': etag})
+        entries = self._entries
+        if self._version != version:
+            entries = self._entries = {}
+            self._version = version
+        entry = entries.get(key)
+        if entry is None:
+            content, headers = build()
+            entry = (render_json(content), headers)
+            # Якщо колекція змінилась під час побудови, такий результат не кешуємо
+            if len(entries) < self.max_entries and self.store.version == version:
+                entries[key] = entry
+        body, headers = entry
+        return Response(body, media_type='application/json', headers={**headers, 'ETag': etag})
+
+async def read_batch(request, adapter):
+    body = await request.body()
+    if request.headers.get('content-type', '').startswith('application/x-ndjson'):
+        body = b'[' + b','.join(line for line in body.splitlines() if line.strip()) + b']'
+    try:
+        return adapter.validate_json(body)
+    except ValidationError as error:
+        raise RequestValidationError(error.errors(include_url=False))
+
+def export_ndjson(store, keys_of, chunk_size=PAGE_SIZE):
+    # Віддає колекцію порціями по ключах, не збираючи її цілком у пам'яті
+    after = None
+    while True:
+        chunk = page_keys(keys_of(), after, chunk_size)
+        if not chunk:
+            return
+        lines = []
+        for key in chunk:
+            item = store.get(key[-1])
+            if item is not None:
+                lines.append(json.dumps(item, ensure_ascii=False) + '\n')
+        if lines:
+            yield ''.join(lines)
+        after = chunk[-1]
+
+class TaskStore:
+    def __init__(self, items=(), index_descriptions=False):
+        self.index_descriptions = index_descriptions
+        self.backend = None
+        self.name = None
+        self.version = 0
+        self._lock = RLock()
+        self.load(items)
+
+    def load(self, items):
+        self._by_id = {}
+        # Ключі (дата, порядковий номер, id) — впорядковані один раз при вставці
+        self._keys = {}
+        self._by_date = []
+        # статус -> відсортований список (порядковий номер, id)
+        self._by_status = {}
+        self._seq = count()
+        self._titles = NgramIndex()
+        self._descriptions = NgramIndex(indexed=self.index_descriptions)
+        for item in items:
+            self.add(item)
+
+    def attach(self, backend, name):
+        self.backend = backend
+        self.name = name
+
+    def _changed(self, op, *args):
+        self.version += 1
+        if self.backend is not None:
+            self.backend.record(self.name, op, args)
+
+    def snapshot(self):
+        return list(self._by_id.values())
+
+    def __iter__(self):
+        return iter(self._by_id.values())
+
+    def __len__(self):
+        return len(self._by_id)
+
+    def _index_status(self, task):
+        insort(self._by_status.setdefault(task['status'], []), self._keys[task['id']][1:])
+
+    def _unindex_status(self, task):
+        bucket = self._by_status[task['status']]
+        del bucket[bisect_left(bucket, self._keys[task['id']][1:])]
+        if not bucket:
+            del self._by_status[task['status']]
+
+    def add(self, task):
+        key_date = parse_date(task['date']).isoformat()
+        with self._lock:
+            self._discard(task['id'])
+            key = (key_date, next(self._seq), task['id'])
+            self._by_id[task['id']] = task
+            self._keys[task['id']] = key
+            insort(self._by_date, key)
+            self._index_status(task)
+            self._titles.add(task['id'], task['title'])
+            self._descriptions.add(task['id'], task['description'])
+            self._changed('add', task)
+            return task
+
+    def create(self, task):
+        # На відміну від add (ним користується й відтворення журналу), наявний id не перезаписує
+        with self._lock:
+            if task['id'] in self._by_id:
+                return None
+            return self.add(task)
+
+    def get(self, id):
+        return self._by_id.get(id)
+
+    def set_status(self, id, status):
+        with self._lock:
+            task = self._by_id.get(id)
+            if task is None:
+                return None
+            self._unindex_status(task)
+            task['status'] = status
+            self._index_status(task)
+            self._changed('set_status', id, status)
+            return task
+
+    def remove(self, id):
+        with self._lock:
+            task = self._discard(id)
+            if task is not None:
+                self._changed('remove', id)
+            return task
+
+    def _discard(self, id):
+        task = self._by_id.get(id)
+        if task is not None:
+            self._unindex_status(task)
+            key = self._keys.pop(id)
+            del self._by_id[id]
+            del self._by_date[bisect_left(self._by_date, key)]
+            self._titles.remove(id)
+            self._descriptions.remove(id)
+        return task
+
+    def date_keys(self):
+        return self._by_date
+
+    def status_keys(self, status):
+        return self._by_status.get(status, [])
+
+    def by_key(self, key):
+        return self._by_id.get(key[-1])
+
+    def search(self, query, limit=None, description=False):
+        # Спочатку збіги в назві, далі раніші входження і коротші тексти.
+        # Під замком лише копіюються кандидати; перебір іде без нього, тож завдання,
+        # видалені тим часом, пропускаються
+        with self._lock:
+            titles = self._titles.candidates(query)
+            descriptions = self._descriptions.candidates(query) if description else []
+        ranked = {}
+        found = {}
+        for rank, field, candidates in ((0, 'title', titles), (1, 'description', descriptions)):
+            for id, position in NgramIndex.matches(candidates, query).items():
+                task = self._by_id.get(id)
+                if task is not None and id not in ranked:
+                    ranked[id] = (rank, position, len(task[field]), id)
+                    found[id] = task
+        if limit is None:
+            keys = sorted(ranked.values())
+        else:
+            keys = nsmallest(limit, ranked.values())
+        return [found[key[3]] for key in keys]
+
+class UserStore:
+    def __init__(self, items=()):
+        self.backend = None
+        self.name = None
+        self.version = 0
+        self._lock = RLock()
+        self.load(items)
+
+    def load(self, items):
+        self._by_id = {}
+        self._keys = {}
+        # (порядковий номер, id) у порядку додавання — загальний і для кожної ролі
+        self._order = []
+        self._by_role = {}
+        self._seq = count()
+        for item in items:
+            self.add(item)
+
+    def attach(self, backend, name):
+        self.backend = backend
+        self.name = name
+
+    def _changed(self, op, *args):
+        self.version += 1
+        if self.backend is not None:
+            self.backend.record(self.name, op, args)
+
+    def snapshot(self):
+        return list(self._by_id.values())
+
+    def __iter__(self):
+        return (self._by_id[key[-1]] for key in self._order)
+
+    def __len__(self):
+        return len(self._by_id)
+
+    def _index_role(self, user):
+        insort(self._by_role.setdefault(user['role'], []), self._keys[user['id']])
+
+    def _unindex_role(self, user):
+        bucket = self._by_role[user['role']]
+        del bucket[bisect_left(bucket, self._keys[user['id']])]
+        if not bucket:
+            del self._by_role[user['role']]
+
+    def add(self, user):
+        with self._lock:
+            self._discard(user['id'])
+            key = (next(self._seq), user['id'])
+            self._by_id[user['id']] = user
+            self._keys[user['id']] = key
+            self._order.append(key)
+            self._index_role(user)
+            self._changed('add', user)
+            return user
+
+    def create(self, user):
+        with self._lock:
+            if user['id'] in self._by_id:
+                return None
+            return self.add(user)
+
+    def get(self, id):
+        return self._by_id.get(id)
+
+    def update(self, id, name, email, role):
+        with self._lock:
+            user = self._by_id.get(id)
+            if user is None:
+                return None
+            if user['role'] != role:
+                self._unindex_role(user)
+                user['role'] = role
+                self._index_role(user)
+            user['name'] = name
+            user['email'] = email
+            self._changed('update', id, name, email, role)
+            return user
+
+    def remove(self, id):
+        with self._lock:
+            user = self._discard(id)
+            if user is not None:
+                self._changed('remove', id)
+            return user
+
+    def _discard(self, id):
+        user = self._by_id.pop(id, None)
+        if user is not None:
+            self._unindex_role(user)
+            key = self._keys.pop(id)
+            del self._order[bisect_left(self._order, key)]
+        return user
+
+    def keys(self, role=None):
+        if role is None:
+            return self._order
+        return self._by_role.get(role, [])
+
+    def by_key(self, key):
+        return self._by_id.get(key[-1])
+
+class MemoryBackend:
+    def open(self, stores):
+        for name, store in stores.items():
+            store.attach(self, name)
+
+    def record(self, collection, op, args):
+        pass
+
+    def commit(self):
+        pass
+
+    def close(self):
+        pass
+
+class LogBackend(MemoryBackend):
+    # Журнал попереднього запису (WAL) + періодичний знімок стану.
+    # Записи від різних запитів збираються в одну групу з одним fsync.
+    def __init__(self, directory, commit_interval=0.005, snapshot_every=10000):
+        self.directory = Path(directory)
+        self.commit_interval = commit_interval
+        self.snapshot_every = snapshot_every
+        self._cond = Condition()
+        self._pending = []
+        self._appended = 0
+        self._durable = 0
+        self._since_snapshot = 0
+        self._closing = False
+        self._error = None
+
+    def _segment(self, number):
+        return self.directory / f'wal-{number:08d}.log'
+
+    def _segments(self):
+        return sorted(int(path.stem[4:]) for path in self.directory.glob('wal-*.log'))
+
+    def open(self, stores):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._stores = stores
+        covered = -1
+        snapshot_path = self.directory / 'snapshot.json'
+        if snapshot_path.exists():
+            snapshot = json.loads(snapshot_path.read_bytes())
+            covered = snapshot['segment']
+            for name, store in stores.items():
+                store.load(snapshot['collections'].get(name, []))
+        segments = [number for number in self._segments() if number > covered]
+        for number in segments:
+            self._replay(self._segment(number))
+        # Після відтворення все стискається в новий знімок, тож наступний старт читає лише його
+        self._current = max(segments, default=covered) + 1
+        self._write_snapshot(self._current - 1)
+        self._file = open(self._segment(self._current), 'a', encoding='utf-8')
+        super().open(stores)
+        self._thread = Thread(target=self._run, name='wal-writer', daemon=True)
+        self._thread.start()
+
+    def _replay(self, path):
+        with open(path, encoding='utf-8') as file:
+            for line in file:
+                try:
+                    collection, op, *args = json.loads(line)
+                except ValueError:
+                    # Обірваний останній запис після аварійного завершення
+                    break
+                getattr(self._stores[collection], op)(*args)
+
+    def _write_snapshot(self, covered):
+        data = {'segment': covered,
+                'collections': {name: store.snapshot() for name, store in self._stores.items()}}
+        temp_path = self.directory / 'snapshot.json.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as file:
+            json.dump(data, file, ensure_ascii=False)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_path, self.directory / 'snapshot.json')
+        for number in self._segments():
+            if number <= covered:
+                self._segment(number).unlink()
+
+    def _rotate(self):
+        # Нові записи йдуть у новий сегмент до того, як знімаємо стан,
+        # тому знімок покриває всі записи старих сегментів
+        self._file.close()
+        self._current += 1
+        self._file = open(self._segment(self._current), 'a', encoding='utf-8')
+        self._write_snapshot(self._current - 1)
+        self._since_snapshot = 0
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._closing:
+                    self._cond.wait()
+                if not self._pending:
+                    return
+            if not self._closing:
+                time.sleep(self.commit_interval)
+            with self._cond:
+                batch, self._pending = self._pending, []
+                ticket = self._appended
+            try:
+                self._file.write(''.join(batch))
+                self._file.flush()
+                os.fsync(self._file.fileno())
+                with self._cond:
+                    self._durable = ticket
+                    self._cond.notify_all()
+                self._since_snapshot += len(batch)
+                if self._since_snapshot >= self.snapshot_every:
+                    self._rotate()
+            except Exception as error:
+                # Збій запису чи ротації зупиняє журнал; очікувачі в commit() отримують помилку
+                with self._cond:
+                    self._error = error
+                    self._cond.notify_all()
+                return
+
+    def record(self, collection, op, args):
+        line = json.dumps([collection, op, *args], ensure_ascii=False) + '\n'
+        with self._cond:
+            self._pending.append(line)
+            self._appended += 1
+            self._cond.notify_all()
+
+    def commit(self):
+        with self._cond:
+            ticket = self._appended
+            while self._durable < ticket:
+                if self._error is not None:
+                    raise self._error
+                if not self._thread.is_alive():
+                    raise RuntimeError('Потік запису журналу зупинився')
+                self._cond.wait()
+
+    def close(self):
+        with self._cond:
+            self._closing = True
+            self._cond.notify_all()
+        self._thread.join()
+        self._file.close()
+        self._write_snapshot(self._current)
+
+users = UserStore([
     {'id': 0, 'name': 'Serhii', 'email': 'bigar@gmail.com', 'role': 'admin'},
     {'id': 1, 'name': 'Viktor', 'email': 'vik@gmail.com', 'role': 'user'},
     {'id': 2, 'name': 'Ivan', 'email': 'iivi@gmail.com', 'role': 'user'},
     {'id': 3, 'name': 'Sam', 'email': 'sam@gmail.com', 'role': 'moderator'}
-]
-tasks = [
+])
+tasks = TaskStore([
     {'id': 1, 'title': 'Налаштувати базу даних для Віктора',
      'description': 'Через недбале використання ресурсів'
     'сталась атака ботів і тепер база даних підвисає',
@@ -37,94 +636,181 @@ tasks = [
     {'id': 4, 'title': 'Купити клавіатуру для 4 магазинів',
      'description': 'Через відкриття нових магазинів треба купити нові',
      'status': 'completed', 'date': '10-01-2021 18:05'}
-]
+], index_descriptions=INDEX_DESCRIPTIONS)
+backend = LogBackend(DATA_DIR) if DATA_DIR else MemoryBackend()
+task_cache = ResponseCache(tasks, 'tasks')
+user_cache = ResponseCache(users, 'users')
+
+@app.on_event('startup')
+def open_storage():
+    backend.open({'users': users, 'tasks': tasks})
+
+@app.on_event('startup')
+async def configure_threadpool():
+    # Читання обслуговуються прямо в циклі подій; у пулі лишаються записи,
+    # які можуть чекати на fsync журналу
+    to_thread.current_default_thread_limiter().total_tokens = THREADPOOL_TOKENS
+
+@app.on_event('shutdown')
+def close_storage():
+    backend.close()
 
 @app.get('/users', summary='Всі користувачі', tags=['Користувачі'])
-def all_users():
-    return users
+async def all_users(cursor: str | None = None, limit: int | None = Query(None, ge=1, le=1000),
+                    if_none_match: str | None = Header(None)):
+    return user_cache.respond(
+        ('users', cursor, limit),
+        lambda: paginate('users', users.keys(), users.by_key, cursor, limit),
+        if_none_match)
+
+@app.get('/users/export', summary='Експорт користувачів у NDJSON', tags=['Користувачі'])
+async def export_users(role: str | None = None):
+    return StreamingResponse(export_ndjson(users, lambda: users.keys(role)),
+                             media_type='application/x-ndjson')
 
 @app.get('/user/{id}', summary='Отримати користувача', tags=['Користувачі'])
-def get_user(id: int):
-    for element in users:
-        if element['id'] == id:
-            return element
+async def get_user(id: int, if_none_match: str | None = Header(None)):
+    return user_cache.respond(('user', id), lambda: (users.get(id), {}), if_none_match)
 
 @app.get('/users/{role}', summary='Сортувати користувачів за роллю', tags=['Користувачі'])
-def get_user_role(role: str):
-    matching_users = []
-    for user in users:
-        if user['role'] == role:
-            matching_users.append(user)
-    return matching_users
+async def get_user_role(role: str, cursor: str | None = None,
+                        limit: int | None = Query(None, ge=1, le=1000),
+                        if_none_match: str | None = Header(None)):
+    return user_cache.respond(
+        ('users_by_role', role, cursor, limit),
+        lambda: paginate('users', users.keys(role), users.by_key, cursor, limit),
+        if_none_match)
 
 @app.post('/users/add', summary='Додати користувача', tags=['Користувачі'])
 def add_user(schema: UserSchema):
-    new_user = users.append(schema.model_dump())
+    new_user = users.create(schema.model_dump())
+    if new_user is None:
+        raise HTTPException(status_code=409, detail='Користувач з таким id вже існує')
+    backend.commit()
     return {'message': 'user added', 'new_user': new_user}
 
+def apply_user_batch(operations):
+    # Кожна операція окремо бере замок сховища, тож читання не чекають увесь пакет
+    results = []
+    for index, operation in enumerate(operations):
+        if operation.op == 'create':
+            user = users.create(operation.user.model_dump())
+            results.append({'index': index, 'id': operation.user.id,
+                            'result': 'created' if user is not None else 'exists'})
+            continue
+        if operation.op == 'update':
+            user = operation.user
+            found = users.update(operation.id, user.name, user.email, user.role)
+            result = 'updated'
+        else:
+            found = users.remove(operation.id)
+            result = 'deleted'
+        results.append({'index': index, 'id': operation.id,
+                        'result': result if found is not None else 'not found'})
+    backend.commit()
+    return results
+
+@app.post('/users/bulk', summary='Пакетні зміни користувачів', tags=['Користувачі'])
+async def bulk_users(request: Request):
+    operations = await read_batch(request, user_operations)
+    results = await run_in_threadpool(apply_user_batch, operations)
+    return {'message': 'batch applied', 'results': results}
+
 @app.put('/user/repair/{id}', summary='Редагувати користувача', tags=['Користувачі'])
 def repair_user(id: int, schema: UserSchema):
-    for element in users:
-        if element['id'] == id:
-            element['name'] = schema.name
-            element['email'] = schema.email
-            element['role'] = schema.role
-            return {'message': 'user was repaired'}
+    if users.update(id, schema.name, schema.email, schema.role) is not None:
+        backend.commit()
+        return {'message': 'user was repaired'}
 
 @app.delete('/user/delete/{id}', summary='Видалити користувача', tags=['Користувачі'])
 def delete_user(id: int):
-    for element in users:
-        if element['id'] == id:
-            users.remove(element)
-            return {'message': 'user deleted'}
+    if users.remove(id) is not None:
+        backend.commit()
+        return {'message': 'user deleted'}
 
 
 
 @app.get('/tasks', summary='Завдання посортовані за датою', tags=['Завдання'])
-def all_tasks():
-    sorted_tasks = sorted(tasks, key=lambda x: datetime.strptime(x['date'], '%d-%m-%Y %H:%M'))
-    return sorted_tasks
+async def all_tasks(cursor: str | None = None, limit: int | None = Query(None, ge=1, le=1000),
+                    if_none_match: str | None = Header(None)):
+    return task_cache.respond(
+        ('tasks', cursor, limit),
+        lambda: paginate('tasks', tasks.date_keys(), tasks.by_key, cursor, limit),
+        if_none_match)
+
+@app.get('/tasks/export', summary='Експорт завдань у NDJSON', tags=['Завдання'])
+async def export_tasks(status: str | None = None):
+    if status is None:
+        keys_of = tasks.date_keys
+    else:
+        keys_of = lambda: tasks.status_keys(status)
+    return StreamingResponse(export_ndjson(tasks, keys_of), media_type='application/x-ndjson')
 
 @app.get('/task/{id}', summary='Отримати завдання', tags=['Завдання'])
-def get_task(id: int):
-    for element in tasks:
-        if element['id'] == id:
-            return element
+async def get_task(id: int, if_none_match: str | None = Header(None)):
+    return task_cache.respond(('task', id), lambda: (tasks.get(id), {}), if_none_match)
 
 @app.post('/task/add', summary='Створити завдання', tags=['Завдання'])
 def add_task(schema: TasksSchema):
     schema.date = datetime.now().strftime("%Y-%m-%d %H:%M")
-    tasks.append(schema.model_dump())
+    if tasks.create(schema.model_dump()) is None:
+        raise HTTPException(status_code=409, detail='Завдання з таким id вже існує')
+    backend.commit()
     return {'message': 'task added'}
 
+def apply_task_batch(operations, date):
+    results = []
+    for index, operation in enumerate(operations):
+        if operation.op == 'create':
+            operation.task.date = date
+            task = tasks.create(operation.task.model_dump())
+            results.append({'index': index, 'id': operation.task.id,
+                            'result': 'created' if task is not None else 'exists'})
+            continue
+        if operation.op == 'update':
+            found = tasks.set_status(operation.id, operation.task.status)
+            result = 'updated'
+        else:
+            found = tasks.remove(operation.id)
+            result = 'deleted'
+        results.append({'index': index, 'id': operation.id,
+                        'result': result if found is not None else 'not found'})
+    backend.commit()
+    return results
+
+@app.post('/tasks/bulk', summary='Пакетні зміни завдань', tags=['Завдання'])
+async def bulk_tasks(request: Request):
+    date = datetime.now().strftime("%Y-%m-%d %H:%M")
+    operations = await read_batch(request, task_operations)
+    results = await run_in_threadpool(apply_task_batch, operations, date)
+    return {'message': 'batch applied', 'results': results}
+
 @app.put('/task/repair/{id}', summary='Коригувати статус завдання', tags=['Завдання'])
 def repair_task_status(schema: TasksSchema, id: int):
-    for element in tasks:
-        if element['id'] == id:
-            element['status'] = schema.status
-            return {'message': 'task repaired'}
+    if tasks.set_status(id, schema.status) is not None:
+        backend.commit()
+        return {'message': 'task repaired'}
 
 @app.delete('/tasks/delete/{id}', summary='Видалити завдання', tags=['Завдання'])
 def delete_task(id: int):
-    for element in tasks:
-        if element['id'] == id:
-            tasks.remove(element)
-            return {'message': 'task deleted'}
+    if tasks.remove(id) is not None:
+        backend.commit()
+        return {'message': 'task deleted'}
 
 @app.get('/tasks/{status}', summary='Сортувати завдання за статусом', tags=['Завдання'])
-def get_task_status(status: str):
-    status_tasks = []
-    for element in tasks:
-        if element['status'] == status:
-            status_tasks.append(element)
-    return status_tasks
+async def get_task_status(status: str, cursor: str | None = None,
+                          limit: int | None = Query(None, ge=1, le=1000),
+                          if_none_match: str | None = Header(None)):
+    return task_cache.respond(
+        ('tasks_by_status', status, cursor, limit),
+        lambda: paginate('tasks_by_status', tasks.status_keys(status), tasks.by_key,
+                         cursor, limit),
+        if_none_match)
 
 @app.get('/task/get/{title}', summary='Пошук завдання за полем title', tags=['Завдання'])
-def get_title_task(title: str):
-    search_title = []
-    for element in tasks:
-        if title in element['title'].lower():
-            search_title.append(element)
-    return search_title
+async def get_title_task(title: str, limit: int | None = Query(None, ge=1),
+                         description: bool = False):
+    # Перебір текстів для коротких запитів і описів — у потоці, не в циклі подій
+    return await run_in_threadpool(tasks.search, title, limit=limit, description=description)
 
 
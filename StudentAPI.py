@@ -1,11 +1,25 @@
-from fastapi import FastAPI, File, UploadFile, HTTPException
+from fastapi import FastAPI, File, UploadFile, HTTPException, Header, Query, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
-from sqlalchemy import MetaData, Table, Column, Integer, String, ForeignKey, LargeBinary
+from sqlalchemy import MetaData, Table, Column, Integer, String, ForeignKey, inspect, select, text, update
+from sqlalchemy.exc import IntegrityError
 from pydantic import BaseModel, Field, field_validator
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from email.utils import parsedate_to_datetime
+import hashlib
+import io
+import os
 import re
+import tempfile
 
 DATABASE_URL = "sqlite+aiosqlite:///./database.db"
+PAGE_SIZE = 100
+COURSE_CAPACITY = 10
+MATERIALS_DIR = os.getenv("STUDENTAPI_MATERIALS_DIR", "./materials")
+MAX_MATERIAL_SIZE = int(os.getenv("STUDENTAPI_MAX_MATERIAL_SIZE", str(50 * 1024 * 1024)))
+CHUNK_SIZE = 1024 * 1024
 
 engine = create_async_engine(DATABASE_URL, echo=True)
 async_session = sessionmaker(
@@ -34,7 +48,13 @@ class Course(Base):
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String(50), unique=True)
     teacher_name = Column(String, ForeignKey("teachers.name"))
-    matherials = Column(LargeBinary)
+    # Сам файл лежить у сховищі MATERIALS_DIR під своїм SHA-256, у базі лише опис
+    matherials_hash = Column(String(64))
+    matherials_size = Column(Integer)
+    matherials_type = Column(String(100))
+    enrolled_count = Column(Integer, nullable=False, default=0, server_default=text("0"))
+    capacity = Column(Integer, nullable=False, default=COURSE_CAPACITY,
+                      server_default=text(str(COURSE_CAPACITY)))
 
 class StudentCourse(Base):
     __tablename__ = "student_course"
@@ -43,10 +63,49 @@ class StudentCourse(Base):
     first_score = Column(Integer)
     second_score = Column(Integer)
 
+def migrate_courses(connection):
+    # create_all не змінює наявних таблиць, тож колонки, додані пізніше, доповнюються тут
+    columns = {column["name"] for column in inspect(connection).get_columns("courses")}
+    for name, definition in (("matherials_hash", "VARCHAR(64)"), ("matherials_size", "INTEGER"),
+                             ("matherials_type", "VARCHAR(100)")):
+        if name not in columns:
+            connection.execute(text(f"ALTER TABLE courses ADD COLUMN {name} {definition}"))
+    if "capacity" not in columns:
+        connection.execute(text("ALTER TABLE courses ADD COLUMN capacity INTEGER NOT NULL"
+                                f" DEFAULT {COURSE_CAPACITY}"))
+    if "enrolled_count" not in columns:
+        connection.execute(text("ALTER TABLE courses ADD COLUMN enrolled_count INTEGER NOT NULL"
+                                " DEFAULT 0"))
+        # Лічильник стартує з фактичної кількості записів, а не з нуля
+        connection.execute(text(
+            "UPDATE courses SET enrolled_count = (SELECT count(*) FROM student_course"
+            " WHERE student_course.course_title = courses.title)"
+        ))
+    if "matherials" in columns:
+        move_material_blobs(connection)
+
+def move_material_blobs(connection):
+    # Старі BLOB-и переносяться у файлове сховище по одному, щоб не тримати всі в пам'яті
+    ids = connection.execute(
+        text("SELECT id FROM courses WHERE matherials IS NOT NULL")
+    ).scalars().all()
+    for id in ids:
+        blob = connection.execute(
+            text("SELECT matherials FROM courses WHERE id = :id"), {"id": id}
+        ).scalar_one()
+        digest, size = store_material(io.BytesIO(blob), max_size=None)
+        connection.execute(
+            text("UPDATE courses SET matherials_hash = :digest, matherials_size = :size,"
+                 " matherials_type = :type, matherials = NULL WHERE id = :id"),
+            {"digest": digest, "size": size, "id": id,
+             "type": "application/pdf" if blob.startswith(b"%PDF") else "application/octet-stream"}
+        )
+
 # Ініціалізація бази даних
 async def init_db():
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(migrate_courses)
 
 app = FastAPI()
 
@@ -79,6 +138,71 @@ async def authenticate_teacher(name: str, password: str, session: AsyncSession):
         return teacher
     raise HTTPException(status_code=403, detail="Invalid username or password")
 
+def encode_cursor(title):
+    return urlsafe_b64encode(title.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor):
+    try:
+        return urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Невірний курсор")
+
+def material_path(digest):
+    return os.path.join(MATERIALS_DIR, digest[:2], digest)
+
+def store_material(source, max_size=MAX_MATERIAL_SIZE):
+    # Копіюємо частинами в тимчасовий файл сховища, рахуючи SHA-256 на льоту;
+    # однаковий вміст потрапляє в той самий файл і зберігається один раз
+    os.makedirs(MATERIALS_DIR, exist_ok=True)
+    digest = hashlib.sha256()
+    size = 0
+    descriptor, temp_path = tempfile.mkstemp(dir=MATERIALS_DIR, suffix=".tmp")
+    try:
+        with os.fdopen(descriptor, "wb") as file:
+            while chunk := source.read(CHUNK_SIZE):
+                size += len(chunk)
+                if max_size is not None and size > max_size:
+                    raise HTTPException(status_code=413, detail="Файл матеріалів завеликий")
+                digest.update(chunk)
+                file.write(chunk)
+            file.flush()
+            os.fsync(file.fileno())
+        path = material_path(digest.hexdigest())
+        if os.path.exists(path):
+            os.remove(temp_path)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    return digest.hexdigest(), size
+
+async def discard_material(session, digest):
+    # Файл видаляється, лише якщо на нього не посилається жоден курс
+    result = await session.execute(select(Course.id).where(Course.matherials_hash == digest).limit(1))
+    if result.fetchone() is None:
+        await run_in_threadpool(remove_material, digest)
+
+def remove_material(digest):
+    try:
+        os.remove(material_path(digest))
+    except FileNotFoundError:
+        pass
+
+def etag_matches(etag, if_none_match):
+    if if_none_match.strip() == "*":
+        return True
+    # Для If-None-Match діє слабке порівняння, тож префікс W/ ігноруємо
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+def not_modified_since(modified, if_modified_since):
+    try:
+        return int(modified) <= parsedate_to_datetime(if_modified_since).timestamp()
+    except (TypeError, ValueError):
+        return False
+
 @app.on_event("startup")
 async def startup():
     await init_db()
@@ -104,57 +228,114 @@ async def create_user(user: UserCreateSchema):
 async def create_course(name: str, password: str, title: str, matherials: UploadFile = File(...)):
     async with async_session() as session:
         teacher = await authenticate_teacher(name, password, session)
-        matherial = await matherials.read()
-        course = Course(title=title, teacher_name=teacher.name, matherials=matherial)
+        if matherials.size is not None and matherials.size > MAX_MATERIAL_SIZE:
+            raise HTTPException(status_code=413, detail="Файл матеріалів завеликий")
+        # Перевірка до запису файлу відсікає більшість повторів; паралельні запити з тією
+        # самою назвою ловить унікальний індекс
+        existing = await session.execute(select(Course.id).where(Course.title == title))
+        if existing.fetchone() is not None:
+            raise HTTPException(status_code=409, detail="Курс з такою назвою вже існує")
+        matherials_hash, matherials_size = await run_in_threadpool(store_material, matherials.file)
+        course = Course(title=title, teacher_name=teacher.name, matherials_hash=matherials_hash,
+                        matherials_size=matherials_size,
+                        matherials_type=matherials.content_type or "application/octet-stream")
         session.add(course)
-        await session.commit()
+        try:
+            await session.commit()
+        except IntegrityError:
+            await session.rollback()
+            await discard_material(session, matherials_hash)
+            raise HTTPException(status_code=409, detail="Курс з такою назвою вже існує")
         return {"message": "Курс успішно створено"}
 
 @app.post("/sign/courses", summary="Записатись на курс", tags=["Курси"])
 async def sign_course(name: str, password: str, course_title: str):
     async with async_session() as session:
         student = await authenticate_student(name, password, session)
+        # Запис і лічильник змінюються в одній транзакції: повтор відсікає первинний
+        # ключ student_course, місце займає умовний UPDATE, тож перевірка і запис атомарні
+        session.add(StudentCourse(course_title=course_title, student_name=student.name))
+        try:
+            await session.flush()
+        except IntegrityError:
+            await session.rollback()
+            raise HTTPException(status_code=400, detail="Студент вже записаний на курс")
         result = await session.execute(
-            Course.__table__.select().where(Course.title == course_title)
-        )
-        course = result.fetchone()
-        if not course:
-            raise HTTPException(status_code=404, detail="Курс не знайдено")
-        student_query = await session.execute(
-            StudentCourse.__table__.select().where(
-                StudentCourse.course_title == course_title
-            )
+            update(Course)
+            .where(Course.title == course_title, Course.enrolled_count < Course.capacity)
+            .values(enrolled_count=Course.enrolled_count + 1)
+            .execution_options(synchronize_session=False)
         )
-        student_records = student_query.fetchall()
-        student_names = [record["student_name"] for record in student_records]
-        if len(student_names) >= 10:
+        if result.rowcount == 0:
+            await session.rollback()
+            course = await session.execute(select(Course.id).where(Course.title == course_title))
+            if course.fetchone() is None:
+                raise HTTPException(status_code=404, detail="Курс не знайдено")
             raise HTTPException(status_code=400, detail="Курс переповнений")
-        elif name in student_names:
-            raise HTTPException(status_code=400, detail="Студент вже записаний на курс")
-        else:
-            student_course = StudentCourse(course_title=course_title, student_name=name)
-            session.add(student_course)
-            await session.commit()
-            return {"message": f"Студент {name} успішно приєднався до {course_title}"}
+        await session.commit()
+        return {"message": f"Студент {name} успішно приєднався до {course_title}"}
 
 @app.get("/course/students", summary="Курси із студентами", tags=["Курси"])
-async def get_courses_with_students():
+async def get_courses_with_students(response: Response, title: str | None = None,
+                                    cursor: str | None = None,
+                                    limit: int | None = Query(None, ge=1, le=1000)):
+    # Два запити на сторінку: курси за назвою (ключ курсора — остання назва),
+    # потім усі їхні студенти одним IN замість окремого запиту на кожен курс
+    if cursor is not None and limit is None:
+        limit = PAGE_SIZE
+    query = select(Course.title, Course.teacher_name).order_by(Course.title)
+    if title is not None:
+        query = query.where(Course.title.contains(title, autoescape=True))
+    if cursor is not None:
+        query = query.where(Course.title > decode_cursor(cursor))
+    if limit is not None:
+        query = query.limit(limit + 1)
     async with async_session() as session:
-        result = []
-        courses_list = await session.execute(Course.__table__.select())
-        for course in courses_list:
-            student_query = await session.execute(
-                StudentCourse.__table__.select().where(
-                    StudentCourse.course_title == course.title
-                )
+        courses = (await session.execute(query)).all()
+        if limit is not None and len(courses) > limit:
+            courses = courses[:limit]
+            response.headers["X-Next-Cursor"] = encode_cursor(courses[-1].title)
+        students = {course.title: [] for course in courses}
+        if students:
+            enrollments = await session.execute(
+                select(StudentCourse.course_title, StudentCourse.student_name)
+                .where(StudentCourse.course_title.in_(list(students)))
+                .order_by(StudentCourse.course_title, StudentCourse.student_name)
             )
-            student_names = [record["student_name"] for record in student_query.fetchall()]
-            result.append({
-                "course_title": course.title,
-                "course_teacher": course.teacher_name,
-                "students": student_names
-            })
-        return result
+            for course_title, student_name in enrollments:
+                students[course_title].append(student_name)
+    return [{
+        "course_title": course.title,
+        "course_teacher": course.teacher_name,
+        "students": students[course.title]
+    } for course in courses]
+
+@app.get("/course/{title}/materials", summary="Завантажити матеріали курсу", tags=["Курси"])
+async def get_course_materials(title: str, if_none_match: str | None = Header(None),
+                               if_modified_since: str | None = Header(None)):
+    async with async_session() as session:
+        result = await session.execute(
+            select(Course.matherials_hash, Course.matherials_type).where(Course.title == title)
+        )
+        course = result.fetchone()
+    if course is None:
+        raise HTTPException(status_code=404, detail="Курс не знайдено")
+    if course.matherials_hash is None:
+        raise HTTPException(status_code=404, detail="Матеріали не знайдено")
+    path = material_path(course.matherials_hash)
+    try:
+        stat_result = await run_in_threadpool(os.stat, path)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Матеріали не знайдено")
+    # FileResponse віддає файл частинами (або через sendfile), сам обробляє Range та
+    # If-Range і ставить ETag з Last-Modified; умовний GET лишається за нами
+    response = FileResponse(path, media_type=course.matherials_type, stat_result=stat_result)
+    if (etag_matches(response.headers["etag"], if_none_match) if if_none_match is not None
+            else if_modified_since is not None
+            and not_modified_since(stat_result.st_mtime, if_modified_since)):
+        return Response(status_code=304, headers={"ETag": response.headers["etag"],
+                                                  "Last-Modified": response.headers["last-modified"]})
+    return response
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# Застосунки — окремі файли в корені репозиторію, а не пакет
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
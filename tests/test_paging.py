@@ -0,0 +1,73 @@
+import pytest
+from fastapi import HTTPException
+
+from FastAPI import TaskStore, decode_cursor, page_keys, paginate
+
+def task(id, date='16-04-2024 18:03', status='in progress'):
+    return {'id': id, 'title': f'Завдання {id}', 'description': 'Опис',
+            'status': status, 'date': date}
+
+def page(store, cursor, limit=3):
+    items, headers = paginate('tasks', store.date_keys(), store.by_key, cursor, limit)
+    return [item['id'] for item in items], headers.get('X-Next-Cursor')
+
+def test_page_keys_resume_after_deleted_key():
+    keys = [1, 3, 5, 7, 9]
+    assert page_keys(keys, None, 2) == [1, 3]
+    # Курсор указує на ключ, якого вже немає — сторінка починається з наступного
+    keys.remove(3)
+    assert page_keys(keys, 3, 2) == [5, 7]
+    assert page_keys(keys, 9, 2) == []
+
+def test_inserts_and_deletes_between_pages():
+    store = TaskStore(task(id, f'{id + 1:02}-04-2024 18:03') for id in range(9))
+    ids, cursor = page(store, None)
+    assert ids == [0, 1, 2]
+    # Вставка перед курсором не зсуває сторінку, вставка після неї потрапляє у видачу,
+    # видалення останнього виданого і ще не виданого завдань нічого не пропускає
+    store.add(task(100, '01-01-2020 00:00'))
+    store.add(task(101, '05-04-2024 20:00'))
+    store.remove(2)
+    store.remove(4)
+    ids, cursor = page(store, cursor)
+    assert ids == [3, 101, 5]
+    ids, cursor = page(store, cursor)
+    assert ids == [6, 7, 8]
+    assert cursor is None
+
+def test_walk_sees_every_task_once():
+    store = TaskStore(task(id) for id in range(10))
+    seen = []
+    ids, cursor = page(store, None, limit=4)
+    while True:
+        seen.extend(ids)
+        if cursor is None:
+            break
+        # Завдання з однаковою датою впорядковані за порядком додавання
+        store.add(task(len(seen) + 100))
+        ids, cursor = page(store, cursor, limit=4)
+    assert seen == list(range(10)) + [104, 108]
+
+def test_status_pages_follow_status_changes():
+    store = TaskStore(task(id) for id in range(6))
+    items, headers = paginate('tasks_by_status', store.status_keys('in progress'),
+                              store.by_key, None, 2)
+    assert [item['id'] for item in items] == [0, 1]
+    store.set_status(1, 'completed')
+    store.set_status(3, 'completed')
+    items, headers = paginate('tasks_by_status', store.status_keys('in progress'),
+                              store.by_key, headers['X-Next-Cursor'], 2)
+    assert [item['id'] for item in items] == [2, 4]
+    items, _ = paginate('tasks_by_status', store.status_keys('completed'), store.by_key, None, 5)
+    assert [item['id'] for item in items] == [1, 3]
+
+def test_cursor_from_other_scope_is_rejected():
+    store = TaskStore(task(id) for id in range(5))
+    _, headers = paginate('tasks', store.date_keys(), store.by_key, None, 2)
+    with pytest.raises(HTTPException) as error:
+        decode_cursor('users', headers['X-Next-Cursor'])
+    assert error.value.status_code == 400
+    with pytest.raises(HTTPException) as error:
+        paginate('tasks_by_status', store.status_keys('in progress'), store.by_key,
+                 headers['X-Next-Cursor'], 2)
+    assert error.value.status_code == 400
@@ -0,0 +1,43 @@
+from BigFastAPI import ProjectRepository, decode_snapshot, encode_snapshot, write_snapshot
+
+def round_trip(users, projects, tasks):
+    data = encode_snapshot(users, projects, tasks)
+    # Кожна секція вирівняна на 8 байтів, тож і весь знімок теж
+    assert len(data) % 8 == 0
+    return [list(rows) for rows in decode_snapshot(data)[:3]]
+
+def test_empty_snapshot():
+    assert round_trip([], [], []) == [[], [], []]
+
+def test_non_ascii_round_trip():
+    users = [(0, 'Сергій', 'admin', 'ab' * 16, 'cd' * 32),
+             (1, 'Łukasz', 'user', '00' * 16, 'ff' * 32)]
+    projects = [(0, 'Сергій', 'Сайт для магазину 🚬', '25-01-2025', 3, 7),
+                (5, 'Łukasz', '', '01-01-2030', 0, 1)]
+    tasks = [(0, 0, 'Дизайн', 'completed'), (0, 1, 'Верстка — ґанок', 'in progress'),
+             (5, 2 ** 40, 'x', 'completed')]
+    assert round_trip(users, projects, tasks) == [users, projects, tasks]
+
+def test_empty_sections_between_filled_ones():
+    projects = [(1, 'Іван', 'Проєкт', '01-01-2030', 0, 1)]
+    assert round_trip([], projects, []) == [[], projects, []]
+
+def test_write_snapshot_replaces_file(tmp_path):
+    path = tmp_path / 'state.bin'
+    write_snapshot(path, ([], [], [(0, 0, 'стара', 'done')], 1))
+    write_snapshot(path, ([], [], [(0, 0, 'нова', 'done')], 1))
+    assert list(decode_snapshot(path.read_bytes())[2]) == [(0, 0, 'нова', 'done')]
+    assert [entry.name for entry in tmp_path.iterdir()] == ['state.bin']
+
+def test_deleted_highest_project_id_is_not_reused():
+    repository = ProjectRepository()
+    for _ in range(3):
+        id = repository.new_project_id()
+        repository.add_project({'user': 'Іван', 'id': id, 'title': 'Проєкт', 'deadline': '01-01-2030'})
+    repository.remove_project(2)
+    projects = [repository.dump_project(id)[0] for id in repository.project_ids()]
+    _, projects, tasks, next_project_id = decode_snapshot(
+        encode_snapshot([], projects, [], repository.next_project_id))
+    restored = ProjectRepository()
+    restored.load(projects, tasks, next_project_id)
+    assert restored.new_project_id() == 3
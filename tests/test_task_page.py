@@ -0,0 +1,71 @@
+import pytest
+
+from BigFastAPI import ProjectRepository, SqliteProjectRepository
+
+PROJECT = {'user': 'Іван', 'id': 0, 'title': 'Проєкт', 'deadline': '01-01-2030'}
+
+# Статуси йдуть упереміш, щоб порядок сторінок давав саме (статус, task_id)
+TASKS = [{'project_id': 0, 'project_tasks': [
+    {'task_id': task_id, 'info': f'Завдання {task_id}', 'status': status}
+    for task_id, status in enumerate(['b', 'a', 'c', 'b', 'a', 'c', 'b'])]}]
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def repository(request, tmp_path):
+    if request.param == 'memory':
+        return ProjectRepository(projects=[PROJECT], tasks=TASKS)
+    return SqliteProjectRepository(str(tmp_path / 'projects.db'), projects=[PROJECT], tasks=TASKS)
+
+def walk(repository, limit, status=None):
+    pages = []
+    after = None
+    while True:
+        tasks, after = repository.task_page(0, status=status, after=after, limit=limit)
+        pages.append([(task['status'], task['task_id']) for task in tasks])
+        if after is None:
+            return pages
+
+def test_pages_cross_status_boundaries(repository):
+    assert walk(repository, 2) == [[('a', 1), ('a', 4)], [('b', 0), ('b', 3)],
+                                   [('b', 6), ('c', 2)], [('c', 5)]]
+    assert walk(repository, 3) == [[('a', 1), ('a', 4), ('b', 0)],
+                                   [('b', 3), ('b', 6), ('c', 2)], [('c', 5)]]
+    assert walk(repository, 10) == [[('a', 1), ('a', 4), ('b', 0), ('b', 3), ('b', 6),
+                                     ('c', 2), ('c', 5)]]
+
+def test_cursor_at_end_of_status_has_next_page(repository):
+    tasks, after = repository.task_page(0, limit=2)
+    assert after == ('a', 4)
+    tasks, after = repository.task_page(0, after=after, limit=3)
+    assert [task['task_id'] for task in tasks] == [0, 3, 6]
+    assert after == ('b', 6)
+
+def test_single_status_pages(repository):
+    assert walk(repository, 2, status='b') == [[('b', 0), ('b', 3)], [('b', 6)]]
+    assert repository.task_page(0, status='missing', limit=2) == ([], None)
+
+def test_cursor_into_emptied_bucket(repository):
+    tasks, after = repository.task_page(0, limit=1)
+    assert after == ('a', 1)
+    # Кошик 'a' зник повністю — наступна сторінка починається з першого статусу після нього
+    repository.set_task_status(0, 1, 'c')
+    repository.remove_task(0, 4)
+    tasks, after = repository.task_page(0, after=after, limit=2)
+    assert [(task['status'], task['task_id']) for task in tasks] == [('b', 0), ('b', 3)]
+    # Так само, коли зник кошик посередині
+    for task_id in (0, 3, 6):
+        repository.remove_task(0, task_id)
+    tasks, after = repository.task_page(0, after=after, limit=2)
+    assert [(task['status'], task['task_id']) for task in tasks] == [('c', 1), ('c', 2)]
+    tasks, after = repository.task_page(0, after=after, limit=2)
+    assert [(task['status'], task['task_id']) for task in tasks] == [('c', 5)]
+    assert after is None
+
+def test_cursor_between_statuses_after_insert(repository):
+    tasks, after = repository.task_page(0, limit=2)
+    # Новий статус між 'a' і 'b' з'являється на наступній сторінці
+    repository.add_task(0, 'Нове', 'aa')
+    tasks, after = repository.task_page(0, after=after, limit=2)
+    assert [(task['status'], task['task_id']) for task in tasks] == [('aa', 7), ('b', 0)]
+
+def test_missing_project(repository):
+    assert repository.task_page(1, limit=2) is None
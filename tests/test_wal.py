@@ -0,0 +1,102 @@
+import subprocess
+import sys
+from pathlib import Path
+from threading import Thread
+
+from FastAPI import LogBackend, TaskStore, UserStore
+
+ROOT = Path(__file__).resolve().parent.parent
+
+def task(id, status='in progress'):
+    return {'id': id, 'title': f'Завдання {id}', 'description': 'Опис',
+            'status': status, 'date': '16-04-2024 18:03'}
+
+def open_stores(directory, **options):
+    stores = {'users': UserStore(), 'tasks': TaskStore()}
+    backend = LogBackend(directory, **options)
+    backend.open(stores)
+    return backend, stores
+
+def test_replay_after_kill(tmp_path):
+    # Процес пише, дочікується fsync і помирає без close — стан має відновитись із журналу
+    script = f'''
+import os, sys
+sys.path.insert(0, {str(ROOT)!r})
+from FastAPI import LogBackend, TaskStore, UserStore
+stores = {{'users': UserStore(), 'tasks': TaskStore()}}
+backend = LogBackend({str(tmp_path)!r})
+backend.open(stores)
+for id in range(5):
+    stores['tasks'].create({{'id': id, 'title': f'Завдання {{id}}', 'description': 'Опис',
+                            'status': 'in progress', 'date': '16-04-2024 18:03'}})
+stores['tasks'].set_status(1, 'completed')
+stores['tasks'].remove(2)
+stores['users'].create({{'id': 7, 'name': 'Іван', 'email': 'i@x.ua', 'role': 'admin'}})
+backend.commit()
+os._exit(0)
+'''
+    subprocess.run([sys.executable, '-c', script], check=True)
+    segments = sorted(tmp_path.glob('wal-*.log'))
+    with open(segments[-1], 'a', encoding='utf-8') as file:
+        file.write('["tasks", "add", {"id": 9')
+
+    backend, stores = open_stores(tmp_path)
+    try:
+        assert sorted(item['id'] for item in stores['tasks']) == [0, 1, 3, 4]
+        assert stores['tasks'].get(1)['status'] == 'completed'
+        assert [key[-1] for key in stores['tasks'].status_keys('completed')] == [1]
+        assert stores['users'].get(7)['name'] == 'Іван'
+    finally:
+        backend.close()
+
+def test_rotation_with_concurrent_writers(tmp_path):
+    backend, stores = open_stores(tmp_path, commit_interval=0, snapshot_every=7)
+
+    def write(base):
+        for id in range(base, base + 50):
+            stores['tasks'].create(task(id))
+            if id % 3 == 0:
+                stores['tasks'].remove(id)
+            backend.commit()
+
+    threads = [Thread(target=write, args=(base,)) for base in range(0, 200, 50)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    expected = sorted(item['id'] for item in stores['tasks'])
+    backend.close()
+
+    backend, stores = open_stores(tmp_path)
+    try:
+        assert sorted(item['id'] for item in stores['tasks']) == expected
+        assert sorted(key[-1] for key in stores['tasks'].date_keys()) == expected
+        # Після відкриття все стиснуто в знімок і лишається один порожній сегмент
+        assert len(list(tmp_path.glob('wal-*.log'))) == 1
+    finally:
+        backend.close()
+
+def test_failed_rotation_fails_commit(tmp_path):
+    backend, stores = open_stores(tmp_path, commit_interval=0, snapshot_every=2)
+
+    def broken_snapshot(covered):
+        raise OSError('На диску немає місця')
+
+    backend._write_snapshot = broken_snapshot
+    errors = []
+
+    def write():
+        try:
+            for id in range(10):
+                stores['tasks'].create(task(id))
+                backend.commit()
+        except OSError as error:
+            errors.append(error)
+
+    # Запис іде в окремому потоці, щоб зависання commit() провалило тест, а не підвісило його
+    writer = Thread(target=write, daemon=True)
+    writer.start()
+    writer.join(timeout=5)
+    assert not writer.is_alive()
+    assert len(errors) == 1
+    assert not backend._thread.is_alive()